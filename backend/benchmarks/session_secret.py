@@ -0,0 +1,49 @@
+#! /usr/bin/env python3
+"""Compares the per-request cost of session secret verification.
+
+Usage: ./benchmarks/session_secret.py [-n ROUNDS]
+"""
+
+from argparse import ArgumentParser, Namespace
+from secrets import token_bytes
+from timeit import timeit
+
+from argon2 import PasswordHasher
+
+from his.crypto import genpw, keyed_hash, verify_keyed_hash
+
+
+def get_args() -> Namespace:
+    """Returns the command line arguments."""
+
+    parser = ArgumentParser(description="Benchmark session secret storage modes.")
+    parser.add_argument(
+        "-n", "--rounds", type=int, default=50, help="number of verifications"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Runs the benchmark."""
+
+    args = get_args()
+    secret = genpw(length=32)
+    hasher = PasswordHasher()
+    argon2_hash = hasher.hash(secret)
+    key = token_bytes(32)
+    hmac_hash = keyed_hash(secret, key)
+
+    argon2 = timeit(lambda: hasher.verify(argon2_hash, secret), number=args.rounds)
+    argon2 /= args.rounds
+    hmac = timeit(
+        lambda: verify_keyed_hash(hmac_hash, secret, key), number=args.rounds
+    )
+    hmac /= args.rounds
+
+    print(f"Argon2:      {argon2 * 1000:10.4f} ms / request")
+    print(f"HMAC-SHA256: {hmac * 1000:10.4f} ms / request")
+    print(f"Saving:      {(argon2 - hmac) * 1000:10.4f} ms / request")
+
+
+if __name__ == "__main__":
+    main()
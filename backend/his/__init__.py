@@ -7,7 +7,7 @@ from his.application import Application
 from his.config import get_cors
 from his.contextlocals import ACCOUNT, CUSTOMER, SESSION
 from his.crypto import genpw
-from his.functions import stakeholders
+from his.functions import iter_stakeholders, stakeholders
 from his.mail import get_mailer
 from his.orm import Account, AccountService, CustomerService, Service
 from his.parsers import account, service
@@ -29,6 +29,7 @@ __all__ = [
     "genpw",
     "get_cors",
     "get_mailer",
+    "iter_stakeholders",
     "root",
     "service",
     "stakeholders",
@@ -46,7 +46,7 @@ def authorized(service_name: str) -> Callable:
             """Wraps the respective function
             with preceding authorization.
             """
-            service = Service.get(Service.name == service_name)
+            service = Service.lookup(service_name)
 
             if can_use(SESSION.account, service):
                 return function(*args, **kwargs)
@@ -5,6 +5,7 @@ import wsgilib
 from his.config import get_cors
 from his.errors import ERRORS
 from his.session import postprocess_response
+from his.tokens import start_revocation_list
 
 
 __all__ = ["Application"]
@@ -20,3 +21,5 @@ class Application(wsgilib.Application):
 
         for exception, function in ERRORS.items():
             self.register_error_handler(exception, function)
+
+        start_revocation_list()
@@ -1,21 +1,36 @@
 """Authorization functions."""
 
 from datetime import datetime
-from typing import Iterable, Iterator, Union
+from json import dumps, loads
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
 
 from mdb import Customer
 
+from his.cache import get_account_version, get_backend, get_customer_version
+from his.config import get_config
+from his.dependencies import get_graph
 from his.orm.account import Account
 from his.orm.account_service import AccountService
 from his.orm.customer_service import CustomerService
 from his.orm.service import Service
 from his.orm.service_dependency import ServiceDependency
+from his.permissions import PermissionIndex, get_index
+from his.schedule import get_schedule
 
 
-__all__ = ["can_use"]
+__all__ = ["can_use", "can_use_many", "get_effective_services"]
 
 
+LOCAL_PERMISSIONS_TTL = 5
 Mapping = Union[AccountService, CustomerService]
+PERMISSIONS_TTL = 300
+
+
+class Permissions(NamedTuple):
+    """Cached effective services of an account."""
+
+    versions: list[str]
+    services: list[int]
 
 
 def get_dependencies(service: Service) -> Iterator[Service]:
@@ -27,48 +42,203 @@ def get_dependencies(service: Service) -> Iterator[Service]:
 def check_dependency_tree(mapping: Mapping, service: Service) -> bool:
     """Checks the dependency tree."""
 
-    return service in {mapping.service, *get_dependencies(mapping.service)}
+    return get_graph().provides(mapping.service_id, service.id)
+
 
+def check_mappings(
+    mappings: Iterable[Mapping], service: Service, *, cached: bool = True
+) -> bool:
+    """Checks the services mappings.
 
-def check_mappings(mappings: Iterable[Mapping], service: Service) -> bool:
-    """Checks the services mappings."""
+    If cached is False, the dependencies of all mappings are resolved
+    with one recursive query instead of the process-wide graph.
+    """
+
+    if cached:
+        return any(check_dependency_tree(mapping, service) for mapping in mappings)
+
+    services = {mapping.service_id for mapping in mappings}
+
+    if service.id in services:
+        return True
 
-    return any(check_dependency_tree(mapping, service) for mapping in mappings)
+    closure = ServiceDependency.closure(services)
+    return any(service.id in dependencies for dependencies in closure.values())
 
 
-def check_customer(customer: Union[Customer, int], service: Service) -> bool:
+def check_customer(
+    customer: Union[Customer, int], service: Service, *, cached: bool = True
+) -> bool:
     """Checks the customer services."""
 
-    now = datetime.now()
     return check_mappings(
-        CustomerService.select(cascade=True).where(
-            (CustomerService.customer == customer)
-            & ((CustomerService.begin >> None) | (CustomerService.begin < now))
-            & ((CustomerService.end >> None) | (CustomerService.end > now))
-        ),
+        CustomerService.active().where(CustomerService.customer == customer),
         service,
+        cached=cached,
     )
 
 
-def check_account(account: Union[Account, int], service: Service) -> bool:
+def check_account(
+    account: Union[Account, int], service: Service, *, cached: bool = True
+) -> bool:
     """Checks the account services."""
 
     return check_mappings(
-        AccountService.select(cascade=True).where(AccountService.account == account),
+        AccountService.select().where(AccountService.account == account),
         service,
+        cached=cached,
+    )
+
+
+def expand(services: Iterable[int]) -> frozenset[int]:
+    """Adds all transitive dependencies to the service IDs."""
+
+    graph = get_graph()
+    expanded = set()
+
+    for service in services:
+        expanded.add(service)
+        expanded.update(graph.dependencies(service))
+
+    return frozenset(expanded)
+
+
+def get_account_services(account: Union[Account, int]) -> frozenset[int]:
+    """Returns the IDs of the services mapped to the account."""
+
+    return frozenset(
+        service
+        for service, in AccountService.select(AccountService.service)
+        .where(AccountService.account == account)
+        .tuples()
+    )
+
+
+def compute_effective_services(
+    account: Account,
+) -> tuple[frozenset[int], Optional[datetime]]:
+    """Computes the IDs of the services the non-root account
+    may use and the next time at which they may change.
+    """
+
+    customer_services, next_change = get_schedule().services(account.customer_id)
+    services = expand(customer_services)
+
+    if account.admin:
+        return services, next_change
+
+    return services & expand(get_account_services(account)), next_change
+
+
+def get_permissions_ttl() -> float:
+    """Returns the time to live of cached effective services.
+
+    Invalidations of process-private backends do not reach the other
+    workers, so their entries only live for [permissions] local-ttl.
+    """
+
+    config = get_config()
+    ttl = config.getfloat("permissions", "ttl", fallback=PERMISSIONS_TTL)
+
+    if get_backend().shared:
+        return ttl
+
+    return min(
+        ttl,
+        config.getfloat("permissions", "local-ttl", fallback=LOCAL_PERMISSIONS_TTL),
     )
 
 
-def can_use(account: Account, service: Service) -> bool:
-    """Checks whether the account may use the given service."""
+def get_effective_services(account: Account) -> frozenset[int]:
+    """Returns the cached IDs of the services the non-root account may use.
+
+    Entries are invalidated by account or customer version changes
+    and by changes of the dependency graph, and expire at the next
+    begin or end of a customer service.
+    """
+
+    graph = "-".join(map(str, get_graph().version))
+    key = f"permissions:{account.id}:{account.customer_id}:{graph}"
+    versions = [
+        get_account_version(account.id).hex(),
+        get_customer_version(account.customer_id).hex(),
+    ]
+
+    if (data := get_backend().get(key)) is not None:
+        try:
+            cached = Permissions(**loads(data))
+        except (TypeError, ValueError):
+            cached = None
+
+        if cached is not None and cached.versions == versions:
+            return frozenset(cached.services)
+
+    now = datetime.now()
+    services, next_change = compute_effective_services(account)
+    ttl = get_permissions_ttl()
+
+    if next_change is not None:
+        ttl = min(ttl, (next_change - now).total_seconds())
+
+    data = dumps(Permissions(versions, sorted(services))._asdict()).encode()
+    get_backend().set(key, data, ttl)
+    return services
+
+
+def use_index() -> bool:
+    """Determines whether to check permissions against the bitset index."""
+
+    return get_config().getboolean("permissions", "index", fallback=False)
+
+
+def get_account_index(account: Account) -> Optional[PermissionIndex]:
+    """Returns the permission index if it is enabled,
+    current and contains the account, else None.
+    """
+
+    if not use_index() or (index := get_index()) is None:
+        return None
+
+    return index if account.id in index else None
+
+
+def can_use(account: Account, service: Service, *, cached: bool = True) -> bool:
+    """Checks whether the account may use the given service.
+
+    Set cached to False for one-off callers without a warm
+    dependency graph, such as command line tools.
+    """
 
     if account.root:
         return True
 
-    if not check_customer(account.customer, service):
+    if cached and (index := get_account_index(account)) is not None:
+        return index.can_use(account.id, service.id)
+
+    if cached:
+        return service.id in get_effective_services(account)
+
+    if not check_customer(account.customer, service, cached=cached):
         return False
 
     if account.admin:
         return True
 
-    return check_account(account, service)
+    return check_account(account, service, cached=cached)
+
+
+def can_use_many(account: Account, services: Iterable[Service]) -> dict[Service, bool]:
+    """Checks which of the given services the account may use.
+
+    This takes at most one customer service and
+    one account service query for any amount of services.
+    """
+
+    if account.root:
+        return {service: True for service in services}
+
+    if (index := get_account_index(account)) is not None:
+        return {service: index.can_use(account.id, service.id) for service in services}
+
+    effective = get_effective_services(account)
+    return {service: service.id in effective for service in services}
@@ -0,0 +1,307 @@
+"""Cache of verified sessions and their principals.
+
+The storage backend is selected in his.conf:
+
+    [cache]
+    backend = memory | shm | network
+
+Only the shm and network backends share entries and
+invalidations across worker processes.
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from hmac import compare_digest, new
+from json import dumps, loads
+from logging import getLogger
+from secrets import token_bytes
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+from his.cache.backend import Backend, Update
+from his.cache.memory import LRUCache
+from his.cache.network import NetworkCache
+from his.cache.shm import SharedMemoryCache
+from his.config import get_config
+
+if TYPE_CHECKING:
+    from his.orm.session import Session
+
+
+__all__ = [
+    "ACCOUNT_FIELDS",
+    "SESSION_FIELDS",
+    "Backend",
+    "CachedSession",
+    "LRUCache",
+    "NetworkCache",
+    "SharedMemoryCache",
+    "Update",
+    "cache_session",
+    "evict_session",
+    "get_account_version",
+    "get_backend",
+    "get_cached_session",
+    "get_customer_version",
+    "get_customers_version",
+    "get_permissions_version",
+    "invalidate_account",
+    "invalidate_customer",
+    "update_session",
+]
+
+
+ACCOUNT_FIELDS = (
+    "id",
+    "customer",
+    "name",
+    "full_name",
+    "email",
+    "deleted",
+    "disabled",
+    "locked_until",
+    "failed_logins",
+    "admin",
+    "root",
+)
+DEFAULT_PATH = "/dev/shm/his-cache"
+DEFAULT_SIZE = 4096
+DEFAULT_SLOT_SIZE = 4096
+DEFAULT_TTL = 60
+DIGEST_KEY = token_bytes(32)
+LOGGER = getLogger("his.cache")
+SESSION_FIELDS = ("id", "start", "end", "login")
+VERSION_TTL = 86400
+_BACKEND = None
+
+
+class CachedSession(NamedTuple):
+    """The principal of a cached, verified session.
+
+    Only the session's and its account's principal fields are
+    cached, as JSON, so that neither the password hash nor the
+    session secret's hash leave the process.
+    """
+
+    digest: str
+    version: str
+    session: dict[str, Any]
+    account: dict[str, Any]
+
+    @classmethod
+    def loads(cls, data: bytes) -> CachedSession:
+        """Deserializes a cache entry."""
+        json = loads(data)
+        return cls(
+            json["digest"],
+            json["version"],
+            parse_datetimes(json["session"]),
+            parse_datetimes(json["account"]),
+        )
+
+    def dumps(self) -> bytes:
+        """Serializes the cache entry."""
+        return dumps(self._asdict(), default=datetime.isoformat).encode()
+
+    @property
+    def end(self) -> datetime:
+        """Returns the end of the session."""
+        return self.session["end"]
+
+
+def load_backend() -> Backend:
+    """Creates the backend configured in his.conf."""
+
+    config = get_config()
+    backend = config.get("cache", "backend", fallback="memory")
+    size = config.getint("cache", "size", fallback=None) or config.getint(
+        "session-cache", "size", fallback=DEFAULT_SIZE
+    )
+
+    if backend == "memory":
+        return LRUCache(size)
+
+    if backend == "shm":
+        return SharedMemoryCache(
+            config.get("cache", "path", fallback=DEFAULT_PATH),
+            size,
+            config.getint("cache", "slot-size", fallback=DEFAULT_SLOT_SIZE),
+        )
+
+    if backend == "network":
+        return NetworkCache.from_url(config.get("cache", "url"))
+
+    raise ValueError(f"Invalid cache backend: {backend}")
+
+
+def get_backend() -> Backend:
+    """Returns the process-wide cache backend."""
+
+    global _BACKEND  # pylint: disable=W0603
+
+    if _BACKEND is None:
+        _BACKEND = load_backend()
+
+    return _BACKEND
+
+
+def get_ttl() -> float:
+    """Returns the maximum time to live of cached sessions."""
+
+    return get_config().getfloat("session-cache", "ttl", fallback=DEFAULT_TTL)
+
+
+def parse_datetimes(json: dict[str, Any]) -> dict[str, Any]:
+    """Parses the serialized datetime fields of a principal."""
+
+    return {
+        key: datetime.fromisoformat(value)
+        if key in {"start", "end", "deleted", "locked_until"} and value
+        else value
+        for key, value in json.items()
+    }
+
+
+def digest(secret: str) -> str:
+    """Returns a fast keyed digest of the session secret.
+
+    Processes sharing a backend need to share the digest key
+    to share entries, otherwise a random per-process key is used.
+    """
+
+    if key := get_config().get("cache", "digest-key", fallback=None):
+        return new(key.encode(), secret.encode(), "sha256").hexdigest()
+
+    return new(DIGEST_KEY, secret.encode(), "sha256").hexdigest()
+
+
+def get_version(key: str) -> bytes:
+    """Returns the current cache version of the respective key.
+
+    A missing version, e.g. one evicted by a colliding key, is
+    replaced by a new random one, so that entries cached under
+    the lost version can never become valid again.
+    """
+
+    if (version := get_backend().get(key)) is None:
+        version = token_bytes(8)
+        get_backend().set(key, version, VERSION_TTL)
+
+    return version
+
+
+def get_account_version(ident: int) -> bytes:
+    """Returns the current cache version of the account."""
+
+    return get_version(f"account:{ident}")
+
+
+def get_customer_version(ident: int) -> bytes:
+    """Returns the current cache version of the customer."""
+
+    return get_version(f"customer:{ident}")
+
+
+def get_customers_version() -> bytes:
+    """Returns the cache version of all customers' services."""
+
+    return get_version("customers")
+
+
+def get_permissions_version() -> bytes:
+    """Returns the cache version of all account and customer permissions."""
+
+    return get_version("permissions")
+
+
+def get_cached_session(ident: int, secret: str) -> Optional[CachedSession]:
+    """Returns the principal of the verified session or None."""
+
+    if (data := get_backend().get(f"session:{ident}")) is None:
+        return None
+
+    try:
+        cached = CachedSession.loads(data)
+    except (KeyError, TypeError, ValueError):
+        evict_session(ident)
+        return None
+
+    if not compare_digest(cached.digest, digest(secret)):
+        return None
+
+    if cached.end <= datetime.now():
+        evict_session(ident)
+        return None
+
+    if cached.version != get_account_version(cached.account["id"]).hex():
+        evict_session(ident)
+        return None
+
+    return cached
+
+
+def cache_session(session: Session, secret: str) -> None:
+    """Caches a verified session."""
+
+    _store(session, digest(secret), get_account_version(session.account_id).hex())
+
+
+def update_session(session: Session) -> None:
+    """Updates a cached session after it has been modified."""
+
+    if (data := get_backend().get(f"session:{session.id}")) is None:
+        return
+
+    try:
+        cached = CachedSession.loads(data)
+    except (KeyError, TypeError, ValueError):
+        evict_session(session.id)
+        return
+
+    _store(session, cached.digest, cached.version)
+
+
+def evict_session(ident: int) -> None:
+    """Removes the respective session from the cache."""
+
+    get_backend().delete(f"session:{ident}")
+
+
+def invalidate_account(ident: int, *, permissions: bool = True) -> None:
+    """Invalidates all cached data of the respective account.
+
+    Set permissions to False if the change does
+    not affect the permission index of any account.
+    """
+
+    get_backend().set(f"account:{ident}", token_bytes(8), VERSION_TTL)
+
+    if permissions:
+        get_backend().set("permissions", token_bytes(8), VERSION_TTL)
+
+
+def invalidate_customer(ident: int) -> None:
+    """Invalidates all cached data of the respective customer."""
+
+    get_backend().set(f"customer:{ident}", token_bytes(8), VERSION_TTL)
+    get_backend().set("customers", token_bytes(8), VERSION_TTL)
+    get_backend().set("permissions", token_bytes(8), VERSION_TTL)
+
+
+def _store(session: Session, secret_digest: str, version: str) -> None:
+    """Stores the session's principal under its ID."""
+
+    cached = CachedSession(
+        secret_digest,
+        version,
+        {field: getattr(session, field) for field in SESSION_FIELDS},
+        {field: session.account.__data__.get(field) for field in ACCOUNT_FIELDS},
+    )
+
+    try:
+        data = cached.dumps()
+    except (TypeError, ValueError) as error:
+        LOGGER.warning("Cannot cache session %s: %s", session.id, error)
+        return
+
+    ttl = min(get_ttl(), (session.end - datetime.now()).total_seconds())
+    get_backend().set(f"session:{session.id}", data, ttl)
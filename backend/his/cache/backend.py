@@ -0,0 +1,72 @@
+"""Common cache backend interface."""
+
+from typing import Any, Callable, NamedTuple, Optional
+
+
+__all__ = ["Backend", "Update"]
+
+
+class Update(NamedTuple):
+    """Result of an atomic update and the key's new value and TTL.
+
+    If value is None, the current value is kept.
+    """
+
+    result: Any
+    value: Optional[bytes]
+    ttl: float
+
+
+class Backend:
+    """Base class for cache backends storing bytes under string keys."""
+
+    # Flag whether entries and invalidations are shared across processes.
+    shared = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None."""
+        if (value := self._get(key)) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Stores a value under the respective key for ttl seconds."""
+        raise NotImplementedError()
+
+    def update(self, key: str, function: Callable[[Optional[bytes]], Update]) -> Any:
+        """Atomically updates the value of the respective key.
+
+        The function receives the current value or None and may
+        be called more than once. Returns the update's result.
+        """
+        raise NotImplementedError()
+
+    def delete(self, key: str) -> None:
+        """Removes the respective key."""
+        raise NotImplementedError()
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        raise NotImplementedError()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None without statistics."""
+        raise NotImplementedError()
+
+    @property
+    def stats(self) -> dict:
+        """Returns the cache statistics."""
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,102 @@
+"""In-process LRU cache backend."""
+
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional
+
+from his.cache.backend import Backend, Update
+
+
+__all__ = ["LRUCache"]
+
+
+LOGGER = getLogger("his.cache")
+
+
+class LRUCache(Backend):
+    """A thread-safe, size-bounded LRU cache with per-entry TTL.
+
+    Entries are private to the process.
+    """
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Stores a value under the respective key."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def update(self, key: str, function: Callable[[Optional[bytes]], Update]) -> Any:
+        """Atomically updates the value of the respective key."""
+        with self._lock:
+            update = function(self._lookup(key))
+
+            if update.value is not None:
+                if evicted := self._store(key, update.value, update.ttl):
+                    LOGGER.warning("Evicted %i live entries for %s.", evicted, key)
+
+            return update.result
+
+    def delete(self, key: str) -> None:
+        """Removes the respective key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None."""
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None without locking."""
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            return None
+
+        if expires <= monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: bytes, ttl: float) -> int:
+        """Stores the value without locking and
+        returns the amount of evicted live entries.
+        """
+        if self.size < 1 or ttl <= 0:
+            return 0
+
+        now = monotonic()
+        self._entries[key] = (now + ttl, value)
+        self._entries.move_to_end(key)
+        evicted = 0
+
+        while len(self._entries) > self.size:
+            expires, _ = self._entries.popitem(last=False)[1]
+
+            if expires > now:
+                evicted += 1
+
+        self.evictions += evicted
+        return evicted
+
+    @property
+    def stats(self) -> dict:
+        """Returns the cache statistics."""
+        return {**super().stats, "size": len(self), "maxsize": self.size}
@@ -0,0 +1,70 @@
+"""Network key-value store cache backend."""
+
+from math import ceil
+from typing import Any, Callable, Optional
+
+from his.cache.backend import Backend, Update
+
+
+__all__ = ["NetworkCache"]
+
+
+class NetworkCache(Backend):
+    """Cache backend using a Redis-compatible key-value store.
+
+    The client must provide get(key), set(key, value, ex=seconds),
+    delete(*keys), scan_iter(match=pattern) and Redis' optimistic
+    transaction(function, *watches, value_from_callable=True),
+    so tests may pass a local stand-in.
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, prefix: str = "his:"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "his:"):
+        """Creates a backend using a Redis client."""
+        from redis import Redis  # pylint: disable=C0415
+
+        return cls(Redis.from_url(url), prefix=prefix)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Stores a value under the respective key."""
+        if ttl > 0:
+            self.client.set(self.prefix + key, value, ex=ceil(ttl))
+
+    def update(self, key: str, function: Callable[[Optional[bytes]], Update]) -> Any:
+        """Atomically updates the value of the respective key.
+
+        The key is watched and the update is retried
+        if another client changes it in the meantime.
+        """
+        key = self.prefix + key
+
+        def transaction(pipe: Any) -> Any:
+            update = function(pipe.get(key))
+            pipe.multi()
+
+            if update.value is not None and update.ttl > 0:
+                pipe.set(key, update.value, ex=ceil(update.ttl))
+
+            return update.result
+
+        return self.client.transaction(transaction, key, value_from_callable=True)
+
+    def delete(self, key: str) -> None:
+        """Removes the respective key."""
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        """Removes all entries with the prefix."""
+        if keys := list(self.client.scan_iter(match=self.prefix + "*")):
+            self.client.delete(*keys)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None."""
+        return self.client.get(self.prefix + key)
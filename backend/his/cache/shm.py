@@ -0,0 +1,164 @@
+"""Shared memory cache backend for worker processes on one host."""
+
+from __future__ import annotations
+from fcntl import LOCK_EX, LOCK_UN, lockf
+from hashlib import sha256
+from logging import getLogger
+from mmap import MAP_SHARED, mmap
+from os import O_CREAT, O_RDWR, fstat, ftruncate, open as os_open
+from struct import Struct
+from threading import Lock
+from time import time
+from typing import Any, Callable, Optional
+
+from his.cache.backend import Backend, Update
+
+
+__all__ = ["SharedMemoryCache"]
+
+
+# Expiry timestamp, key digest and value length.
+HEADER = Struct("<d32sI")
+LOGGER = getLogger("his.cache")
+
+
+class SlotLock:
+    """Locks a slot across threads and processes."""
+
+    def __init__(self, fd: int, lock: Lock, offset: int, length: int):
+        self.fd = fd
+        self.lock = lock
+        self.offset = offset
+        self.length = length
+
+    def __enter__(self):
+        self.lock.acquire()
+
+        try:
+            lockf(self.fd, LOCK_EX, self.length, self.offset)
+        except BaseException:
+            self.lock.release()
+            raise
+
+        return self
+
+    def __exit__(self, *_):
+        try:
+            lockf(self.fd, LOCK_UN, self.length, self.offset)
+        finally:
+            self.lock.release()
+
+
+class SharedMemoryCache(Backend):
+    """A fixed-size hash table in a memory-mapped file.
+
+    Every key is mapped to exactly one slot, so colliding keys
+    evict each other. Slots are locked with byte-range locks,
+    so all processes mapping the same file share the entries.
+    The file name is suffixed with the table's geometry, so that
+    processes configured differently, e.g. during a rolling
+    configuration change, never resize a file mapped by others.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, slots: int, slot_size: int):
+        super().__init__()
+        self.slots = slots
+        self.slot_size = slot_size
+        self.path = f"{path}.{slots}x{slot_size}"
+        self._lock = Lock()
+        self._fd = os_open(self.path, O_RDWR | O_CREAT, 0o600)
+        size = slots * slot_size
+
+        if (current := fstat(self._fd).st_size) == 0:
+            ftruncate(self._fd, size)
+        elif current != size:
+            raise ValueError(f"Cache file {self.path} has {current} bytes.")
+
+        self._mmap = mmap(self._fd, size, MAP_SHARED)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Stores a value under the respective key."""
+        digest, offset = self._locate(key)
+
+        with self._locked(offset):
+            self._write(digest, offset, value, ttl)
+
+    def update(self, key: str, function: Callable[[Optional[bytes]], Update]) -> Any:
+        """Atomically updates the value of the respective key.
+
+        The slot stays locked from reading the value until writing the new one.
+        """
+        digest, offset = self._locate(key)
+
+        with self._locked(offset):
+            update = function(self._read(digest, offset))
+
+            if update.value is not None:
+                if self._write(digest, offset, update.value, update.ttl):
+                    LOGGER.warning("Evicted a live entry for %s.", key)
+
+            return update.result
+
+    def delete(self, key: str) -> None:
+        """Removes the respective key."""
+        digest, offset = self._locate(key)
+
+        with self._locked(offset):
+            _, stored, _ = HEADER.unpack_from(self._mmap, offset)
+
+            if stored == digest:
+                HEADER.pack_into(self._mmap, offset, 0, bytes(32), 0)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        for slot in range(self.slots):
+            offset = slot * self.slot_size
+
+            with self._locked(offset):
+                HEADER.pack_into(self._mmap, offset, 0, bytes(32), 0)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """Returns the value for the key or None."""
+        digest, offset = self._locate(key)
+
+        with self._locked(offset):
+            return self._read(digest, offset)
+
+    def _read(self, digest: bytes, offset: int) -> Optional[bytes]:
+        """Returns the value of the locked slot or None."""
+        expires, stored, length = HEADER.unpack_from(self._mmap, offset)
+
+        if stored != digest or expires <= time():
+            return None
+
+        start = offset + HEADER.size
+        return self._mmap[start : start + length]
+
+    def _write(self, digest: bytes, offset: int, value: bytes, ttl: float) -> bool:
+        """Writes the value into the locked slot and
+        returns whether another live entry was evicted.
+        """
+        if ttl <= 0 or HEADER.size + len(value) > self.slot_size:
+            return False
+
+        now = time()
+        expires, stored, _ = HEADER.unpack_from(self._mmap, offset)
+        start = offset + HEADER.size
+        self._mmap[offset:start] = HEADER.pack(now + ttl, digest, len(value))
+        self._mmap[start : start + len(value)] = value
+
+        evicted = stored not in {digest, bytes(32)} and expires > now
+        self.evictions += evicted
+        return evicted
+
+    def _locate(self, key: str) -> tuple[bytes, int]:
+        """Returns the key digest and slot offset."""
+        digest = sha256(key.encode()).digest()
+        slot = int.from_bytes(digest[:8], "little") % self.slots
+        return digest, slot * self.slot_size
+
+    def _locked(self, offset: int) -> SlotLock:
+        """Returns a lock for the slot at the given offset."""
+        return SlotLock(self._fd, self._lock, offset, self.slot_size)
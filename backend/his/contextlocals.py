@@ -1,32 +1,65 @@
-"""HIS request context locals."""
+"""HIS request context locals.
+
+Sessions restored from a signed token or from the session cache and
+their principals are partial records, that only carry the fields needed
+for authentication and authorization. The proxies replace them with
+the full records on the first access of any other attribute.
+"""
 
 from datetime import datetime
+from functools import wraps
+from typing import Any, Callable
 
-from flask import request
+from flask import g, request
+from peewee import Field, ForeignKeyField, Model
 from werkzeug.local import LocalProxy
 
 from mdb import Customer
 from wsgilib import InvalidData
 
+from his.cache import cache_session, get_cached_session
 from his.config import get_config
 from his.exceptions import NotAuthorized
 from his.exceptions import NoSessionSpecified
 from his.exceptions import SessionExpired
 from his.orm.account import Account
 from his.orm.session import DURATION, DURATION_RANGE, Session
+from his.tokens import get_token_session
 
 
 __all__ = [
     "SESSION",
     "ACCOUNT",
     "CUSTOMER",
+    "complete_session",
+    "get_current_session",
     "get_session",
     "get_session_duration",
     "get_session_id",
     "get_session_secret",
+    "invalidate",
 ]
 
 
+CACHE = "his_context_locals"
+PRINCIPAL_ATTRIBUTES = frozenset(
+    {
+        "__data__",
+        "_meta",
+        "_pk",
+        "can_login",
+        "get_id",
+        "locked",
+        "partial",
+        "renew",
+        "select_subjects",
+        "stateless",
+        "subjects",
+        "unusable",
+    }
+)
+
+
 def get_session_id() -> int:
     """Returns the session ID."""
 
@@ -50,9 +83,66 @@ def get_session_secret() -> str:
         raise NoSessionSpecified() from None
 
 
+def request_cached(
+    key: str, *, errors: tuple[type[Exception], ...] = ()
+) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+    """Caches the function's return value on the request context.
+
+    Exceptions of the given types are cached as well
+    and re-raised on subsequent calls.
+    """
+
+    def decorator(function: Callable[[], Any]) -> Callable[[], Any]:
+        """Wraps the respective function."""
+
+        @wraps(function)
+        def wrapper():
+            """Returns the cached value or calls the function."""
+            cache = g.setdefault(CACHE, {})
+
+            try:
+                result = cache[key]
+            except KeyError:
+                try:
+                    result = cache[key] = function()
+                except errors as error:
+                    cache[key] = error
+                    raise
+
+            if isinstance(result, errors):
+                raise result
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*keys: str) -> None:
+    """Drops request-cached context locals.
+
+    Valid keys are "session", "account" and "customer".
+    If no keys are given, all of them are dropped.
+    """
+
+    if (cache := g.get(CACHE)) is None:
+        return
+
+    if not keys:
+        cache.clear()
+        return
+
+    for key in keys:
+        cache.pop(key, None)
+
+
 def get_session(ident: int, secret: str) -> Session:
     """Returns the session from the cache."""
 
+    if (cached := get_cached_session(ident, secret)) is not None:
+        return Session.restore(cached.session, cached.account)
+
     now = datetime.now()
     condition = Session.id == ident
     condition &= Session.start < now
@@ -64,18 +154,59 @@ def get_session(ident: int, secret: str) -> Session:
         raise SessionExpired() from None
 
     if session.verify(secret):
+        cache_session(session, secret)
         return session
 
     raise SessionExpired()
 
 
+@request_cached("session", errors=(NoSessionSpecified, SessionExpired))
+def get_current_session() -> Session:
+    """Returns the session of the current request.
+
+    A valid signed token takes precedence over the database session.
+    """
+
+    if (session := get_token_session()) is not None:
+        return session
+
+    return get_session(get_session_id(), get_session_secret())
+
+
+def complete_session() -> Session:
+    """Replaces the current request's partial session
+    and its principals with their full records.
+    """
+
+    if not (partial := get_current_session()).partial:
+        return partial
+
+    try:
+        session = Session.select(cascade=True).where(Session.id == partial.id).get()
+    except Session.DoesNotExist:
+        raise SessionExpired() from None
+
+    session.stateless = partial.stateless
+    cache = g.setdefault(CACHE, {})
+    cache["session"] = session
+
+    if cache.get("account") is partial.account:
+        cache["account"] = session.account
+
+    if cache.get("customer") is partial.account.customer:
+        cache["customer"] = session.account.customer
+
+    return session
+
+
+@request_cached("account")
 def get_account() -> Account:
     """Gets the verified targeted account."""
 
     try:
         account_id = request.args["account"]
     except KeyError:
-        return SESSION.account
+        return get_current_session().account
 
     try:
         account_id == int(account_id)
@@ -95,11 +226,12 @@ def get_account() -> Account:
     raise NotAuthorized()
 
 
+@request_cached("customer")
 def get_customer() -> Customer:
     """Gets the verified targeted customer."""
 
     if (customer_id := request.args.get("customer")) is None:
-        return ACCOUNT.customer
+        return get_account().customer
 
     if not SESSION.account.root:
         raise NotAuthorized()
@@ -129,14 +261,52 @@ def get_session_duration() -> int:
     return DURATION
 
 
+def is_principal(record: Model, name: str) -> bool:
+    """Determines whether the attribute is available on a partial record."""
+
+    if name in PRINCIPAL_ATTRIBUTES:
+        return True
+
+    if not isinstance(field := getattr(type(record), name, None), Field):
+        return False
+
+    if isinstance(field, ForeignKeyField) and name == field.object_id_name:
+        return field.name in record.__data__
+
+    return name in record.__data__
+
+
 class ModelProxy(LocalProxy):
     """Proxies ORM models."""
 
+    def __getattr__(self, name: str) -> Any:
+        """Returns the attribute, completing partial records as needed."""
+        record = self._get_current_object()
+
+        if not getattr(record, "partial", False):
+            return getattr(record, name)
+
+        if not is_principal(record, name):
+            return getattr(self._get_complete_object(), name)
+
+        if getattr(value := getattr(record, name), "partial", False):
+            # Related partial records are proxied, so that they are completed too.
+            return ModelProxy(lambda: getattr(self._get_current_object(), name))
+
+        return value
+
     def __int__(self):
         """Returns the primary key value."""
         return self.get_id()
 
+    def _get_complete_object(self) -> Model:
+        """Returns the proxied record, completing it if it is partial."""
+        if getattr(self._get_current_object(), "partial", False):
+            complete_session()
+
+        return self._get_current_object()
+
 
-SESSION = ModelProxy(lambda: get_session(get_session_id(), get_session_secret()))
+SESSION = ModelProxy(get_current_session)
 ACCOUNT = ModelProxy(get_account)
 CUSTOMER = ModelProxy(get_customer)
@@ -1,12 +1,24 @@
 """HIS cryptography library."""
 
 from getpass import getpass
+from hashlib import sha256
+from hmac import compare_digest, new
 from secrets import choice
 from string import ascii_letters, digits
 from sys import stderr
 
 
-__all__ = ["genpw", "read_passwd"]
+__all__ = [
+    "KEYED_HASH_PREFIX",
+    "genpw",
+    "is_keyed_hash",
+    "keyed_hash",
+    "read_passwd",
+    "verify_keyed_hash",
+]
+
+
+KEYED_HASH_PREFIX = "$hmac-sha256$"
 
 
 def genpw(length: int = 16, *, pool: str = ascii_letters + digits) -> str:
@@ -34,3 +46,25 @@ def read_passwd() -> str:
 
         print("Passwords do not match.", file=stderr)
         continue
+
+
+def keyed_hash(secret: str, key: bytes) -> str:
+    """Returns a keyed HMAC-SHA256 hash of a high-entropy secret.
+
+    This is only suitable for random secrets such as session
+    secrets, not for user-chosen passwords.
+    """
+
+    return KEYED_HASH_PREFIX + new(key, secret.encode(), sha256).hexdigest()
+
+
+def is_keyed_hash(value: object) -> bool:
+    """Checks whether the value is a keyed hash."""
+
+    return isinstance(value, str) and value.startswith(KEYED_HASH_PREFIX)
+
+
+def verify_keyed_hash(hashed: str, secret: str, key: bytes) -> bool:
+    """Verifies a secret against a keyed hash in constant time."""
+
+    return compare_digest(hashed.encode(), keyed_hash(secret, key).encode())
@@ -0,0 +1,145 @@
+"""Process-wide transitive closure of the service dependency graph."""
+
+from __future__ import annotations
+from collections import defaultdict
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+from typing import Iterable, Optional
+
+from peewee import fn
+
+from his.config import get_config
+from his.orm.service_dependency import ServiceDependency
+
+
+__all__ = ["DependencyGraph", "get_graph"]
+
+
+CHECK_INTERVAL = 10
+LOGGER = getLogger("his.dependencies")
+TTL = 300
+
+
+class DependencyGraph:
+    """Maps service IDs to the IDs of all of their transitive dependencies."""
+
+    def __init__(self, edges: Iterable[tuple[int, int]], version: tuple):
+        self.version = version
+        direct = defaultdict(set)
+
+        for service, dependency in edges:
+            direct[service].add(dependency)
+
+        self.closure = {service: closure(service, direct) for service in direct}
+
+    def dependencies(self, service: int) -> frozenset[int]:
+        """Returns the IDs of all transitive dependencies of the service."""
+        return self.closure.get(service, frozenset())
+
+    def dependents(self, service: int) -> frozenset[int]:
+        """Returns the IDs of all services that transitively depend on the service."""
+        return frozenset(
+            dependent
+            for dependent, dependencies in self.closure.items()
+            if service in dependencies
+        )
+
+    def provides(self, service: int, dependency: int) -> bool:
+        """Checks whether the service is or depends on the dependency."""
+        return service == dependency or dependency in self.dependencies(service)
+
+    @classmethod
+    def load(cls) -> DependencyGraph:
+        """Loads the graph with one query."""
+        select = ServiceDependency.select(
+            ServiceDependency.service, ServiceDependency.dependency
+        )
+        return cls(select.tuples(), get_version())
+
+
+class CachedGraph:
+    """Holds the graph and rebuilds it after a version change or its TTL."""
+
+    def __init__(self):
+        self.graph = None
+        self.loaded = 0
+        self.checked = 0
+        self.lock = Lock()
+
+    def get(self) -> DependencyGraph:
+        """Returns a current graph."""
+        config = get_config()
+        ttl = config.getfloat("dependencies", "ttl", fallback=TTL)
+        interval = config.getfloat(
+            "dependencies", "check-interval", fallback=CHECK_INTERVAL
+        )
+
+        with self.lock:
+            now = monotonic()
+
+            if self.graph is None or now - self.loaded >= ttl:
+                return self._load(now)
+
+            if now - self.checked >= interval:
+                self.checked = now
+
+                if get_version() != self.graph.version:
+                    return self._load(now)
+
+            return self.graph
+
+    def clear(self) -> None:
+        """Forces a rebuild on next access."""
+        with self.lock:
+            self.graph = None
+
+    def _load(self, now: float) -> DependencyGraph:
+        """Rebuilds the graph."""
+        self.graph = DependencyGraph.load()
+        self.loaded = self.checked = now
+        LOGGER.debug("Loaded dependency graph version %s.", self.graph.version)
+        return self.graph
+
+
+GRAPH = CachedGraph()
+
+
+def closure(service: int, direct: dict[int, set[int]]) -> frozenset[int]:
+    """Returns all transitive dependencies of the service.
+
+    Each node is visited at most once, so cycles terminate.
+    """
+
+    seen = set()
+    stack = list(direct.get(service, ()))
+
+    while stack:
+        if (dependency := stack.pop()) in seen:
+            continue
+
+        seen.add(dependency)
+        stack.extend(direct.get(dependency, ()))
+
+    return frozenset(seen)
+
+
+def get_version() -> tuple[Optional[int], ...]:
+    """Returns a cheap fingerprint of the service_dependency table."""
+
+    return (
+        ServiceDependency.select(
+            fn.COUNT(ServiceDependency.id),
+            fn.MAX(ServiceDependency.id),
+            fn.SUM(ServiceDependency.service),
+            fn.SUM(ServiceDependency.dependency),
+        )
+        .tuples()
+        .get()
+    )
+
+
+def get_graph() -> DependencyGraph:
+    """Returns the process-wide dependency graph."""
+
+    return GRAPH.get()
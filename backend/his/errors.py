@@ -3,6 +3,7 @@
 from argon2.exceptions import VerifyMismatchError
 from peewee import IntegrityError
 
+from filedb import File
 from peeweeplus import FieldNotNullable
 from peeweeplus import FieldValueError
 from peeweeplus import InvalidKeys
@@ -14,7 +15,11 @@ from wsgilib import InvalidData, JSONMessage
 
 from his.exceptions import AccountLimitReached
 from his.exceptions import AccountLocked
+from his.exceptions import HashingPoolExhausted
 from his.exceptions import InvalidCredentials
+from his.exceptions import InvalidFields
+from his.exceptions import InvalidPagination
+from his.exceptions import LoginThrottled
 from his.exceptions import NoSessionSpecified
 from his.exceptions import NotAuthorized
 from his.exceptions import RecaptchaNotConfigured
@@ -43,6 +48,14 @@ NOT_AUTHORIZED = JSONMessage("Not authorized.", status=403)
 PASSWORD_TOO_SHORT = JSONMessage("Password too short.", status=415)
 
 
+def retry_later(message: str, status: int, retry_after: int) -> JSONMessage:
+    """Returns a message with a Retry-After header."""
+
+    response = JSONMessage(message, status=status)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
 ERRORS = {
     Account.DoesNotExist: lambda _: JSONMessage("No such account.", status=404),
     AccountLimitReached: lambda _: JSONMessage("Account limit reached.", status=403),
@@ -72,10 +85,21 @@ ERRORS = {
         value=str(error.value),
         type=type(error.value).__name__,
     ),
+    File.DoesNotExist: lambda _: JSONMessage("No such file.", status=404),
+    HashingPoolExhausted: lambda error: retry_later(
+        "Too many concurrent logins.", 503, error.retry_after
+    ),
     IntegrityError: lambda error: JSONMessage(str(error), status=409),
     InvalidCredentials: lambda _: INVALID_CREDENTIALS,
     InvalidData: lambda error: JSONMessage(str(error), status=400),
+    InvalidFields: lambda error: JSONMessage(
+        "Unknown fields.", fields=sorted(error.fields), status=400
+    ),
     InvalidKeys: lambda error: INVALID_KEYS.update(keys=error.invalid_keys),
+    InvalidPagination: lambda error: JSONMessage(str(error), status=400),
+    LoginThrottled: lambda error: retry_later(
+        "Too many login attempts.", 429, error.retry_after
+    ),
     MissingKeyError: lambda error: MISSING_KEY_ERROR.update(
         model=error.model.__name__,
         field=type(error.field).__name__,
@@ -3,7 +3,11 @@
 __all__ = [
     "AccountLimitReached",
     "AccountLocked",
+    "HashingPoolExhausted",
     "InvalidCredentials",
+    "InvalidFields",
+    "InvalidPagination",
+    "LoginThrottled",
     "NoSessionSpecified",
     "NotAuthorized",
     "RecaptchaNotConfigured",
@@ -20,10 +24,38 @@ class AccountLocked(Exception):
     """Indicates that the account is currently locked."""
 
 
+class HashingPoolExhausted(Exception):
+    """Indicates that the password hashing pool is saturated."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
 class InvalidCredentials(Exception):
     """Indicates invalid credentials such as user name or password."""
 
 
+class InvalidFields(Exception):
+    """Indicates that unknown fields were requested."""
+
+    def __init__(self, fields: set[str]):
+        super().__init__(fields)
+        self.fields = fields
+
+
+class InvalidPagination(Exception):
+    """Indicates an invalid page size or cursor."""
+
+
+class LoginThrottled(Exception):
+    """Indicates that too many login attempts have been made."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
 class NoSessionSpecified(Exception):
     """Indicates that no session was specified."""
 
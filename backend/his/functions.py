@@ -1,26 +1,111 @@
 """Miscellaneous functions."""
 
-from typing import Iterable, Union
+from datetime import datetime
+from typing import Iterator, Union
 
+from peewee import Expression, Field, Model, Select
+
+from his.dependencies import get_graph
 from his.orm import Account, AccountService, CustomerService, Service
 
 
-__all__ = ["stakeholders"]
+__all__ = ["batches", "iter_stakeholders", "stakeholders"]
+
+
+BATCH_SIZE = 1000
+
 
+def providers(service: Service) -> frozenset[int]:
+    """Returns the IDs of the services that grant the given service."""
 
-def stakeholders(service: Union[Service, str]) -> Iterable[Account]:
-    """Select accounts that can use the given service."""
+    return get_graph().dependents(service.id) | {service.id}
 
-    if isinstance(service, str):
-        service = Service.get(Service.name == service)
 
-    return (
-        Account.select()
-        .join(AccountService)
-        .join_from(
-            Account, CustomerService, on=Account.customer == CustomerService.customer
-        )
-        .where(
-            (AccountService.service == service) & (CustomerService.service == service)
-        )
+def grants(service: Service, now: datetime) -> Expression:
+    """Returns an expression selecting non-root accounts
+    that may use the given service at the given time.
+    """
+
+    services = tuple(providers(service))
+    customers = CustomerService.active(CustomerService.customer, now=now).where(
+        CustomerService.service << services
+    )
+    accounts = AccountService.select(AccountService.account).where(
+        AccountService.service << services
     )
+    return (Account.customer << customers) & (
+        (Account.admin == 1) | (Account.id << accounts)
+    )
+
+
+def grants_any(services: tuple[Union[Service, int, str], ...]) -> Expression:
+    """Returns an expression selecting accounts
+    that may use any of the given services now.
+    """
+
+    services = [
+        service if isinstance(service, Service) else Service.lookup(service)
+        for service in services
+    ]
+
+    if not services:
+        return Account.id.in_([])
+
+    now = datetime.now()
+    condition = Account.root == 1
+
+    for service in services:
+        condition |= grants(service, now)
+
+    return condition
+
+
+def stakeholders(*services: Union[Service, int, str]) -> Select:
+    """Selects accounts that can use any of the given services.
+
+    The rules are the same as those of his.authorization.can_use().
+    """
+
+    return Account.select().where(grants_any(services))
+
+
+def iter_stakeholders(
+    *services: Union[Service, int, str],
+    ids: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[Union[Account, int]]:
+    """Yields the stakeholders of the given services in batches ordered by ID.
+
+    If ids is True, only the account IDs are yielded.
+    """
+
+    select = Account.select(Account.id) if ids else Account.select()
+    select = select.where(grants_any(services))
+
+    for account in batches(select, Account.id, batch_size=batch_size):
+        yield account.id if ids else account
+
+
+def batches(
+    select: Select, key: Field, *, batch_size: int = BATCH_SIZE
+) -> Iterator[Model]:
+    """Yields the selected records ordered by the unique key.
+
+    Each batch is fetched with its own keyset-paginated query,
+    so that the database driver, which buffers result sets in
+    full, never holds more than batch_size rows at once.
+    """
+
+    last = None
+
+    while True:
+        query = select if last is None else select.where(key > last)
+        count = 0
+
+        for record in query.order_by(key).limit(batch_size).iterator():
+            count += 1
+            last = getattr(record, key.name)
+            yield record
+
+        if count < batch_size:
+            return
@@ -0,0 +1,256 @@
+"""Password hashing parameters and a bounded worker pool.
+
+Argon2 releases the GIL, so verifying passwords on a small thread
+pool keeps bursts of logins from blocking every WSGI worker thread.
+The pool logs its queue depth and latencies every [argon2] stats-interval
+seconds, unless that is set to 0.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from logging import getLogger
+from threading import BoundedSemaphore, Lock
+from time import monotonic, perf_counter
+from typing import Any, Callable, Iterator, NamedTuple
+
+from argon2 import PasswordHasher
+
+from his.config import get_config
+from his.exceptions import HashingPoolExhausted
+from his.periodic import PeriodicTask
+
+
+__all__ = [
+    "HASHER",
+    "Calibration",
+    "HashingPool",
+    "calibrate",
+    "get_hasher",
+    "get_max_hash_length",
+    "get_pool",
+    "run",
+]
+
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_RETRY_AFTER = 1
+DEFAULT_STATS_INTERVAL = 60
+DEFAULT_WORKERS = 4
+LOGGER = getLogger("his.hashing")
+# Width of the passwd column, i.e. the hash length at argon2-cffi's defaults.
+MAX_HASH_LENGTH = 97
+MAX_TIME_COST = 64
+_POOL = None
+
+
+class Calibration(NamedTuple):
+    """Argon2 parameters and their measured hashing latency."""
+
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+    latency: float
+    length: int
+
+
+class HashingPool:
+    """A thread pool with a bounded queue that fails fast when full."""
+
+    def __init__(self, workers: int, queue_size: int, retry_after: int):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="argon2")
+        self.slots = BoundedSemaphore(workers + queue_size)
+        self.retry_after = retry_after
+        self.lock = Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def run(self, function: Callable[..., Any], *args) -> Any:
+        """Runs the function on the pool and waits for its result."""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+
+            raise HashingPoolExhausted(self.retry_after)
+
+        with self.lock:
+            self.queued += 1
+
+        try:
+            future = self.executor.submit(self._run, function, *args)
+        except BaseException:
+            with self.lock:
+                self.queued -= 1
+
+            self.slots.release()
+            raise
+
+        return future.result()
+
+    def _run(self, function: Callable[..., Any], *args) -> Any:
+        """Runs the function and records its latency."""
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+
+        start = monotonic()
+
+        try:
+            return function(*args)
+        finally:
+            latency = monotonic() - start
+
+            with self.lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+            self.slots.release()
+
+    @property
+    def stats(self) -> dict:
+        """Returns the pool's metrics."""
+        with self.lock:
+            if self.completed:
+                avg_latency = self.total_latency / self.completed
+            else:
+                avg_latency = None
+
+            return {
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avgLatency": avg_latency,
+                "maxLatency": self.max_latency,
+            }
+
+    def report(self) -> None:
+        """Logs the pool's metrics."""
+        stats = self.stats
+        LOGGER.info(
+            "Hashing pool: %i queued, %i active, %i completed, %i rejected, "
+            "%s s average and %.3f s maximum latency.",
+            stats["queued"],
+            stats["active"],
+            stats["completed"],
+            stats["rejected"],
+            "-" if stats["avgLatency"] is None else f"{stats['avgLatency']:.3f}",
+            stats["maxLatency"],
+        )
+
+
+def get_pool() -> HashingPool:
+    """Returns the process-wide hashing pool."""
+
+    global _POOL  # pylint: disable=W0603
+
+    if _POOL is None:
+        config = get_config()
+        _POOL = HashingPool(
+            config.getint("argon2", "workers", fallback=DEFAULT_WORKERS),
+            config.getint("argon2", "queue-size", fallback=DEFAULT_QUEUE_SIZE),
+            config.getint("argon2", "retry-after", fallback=DEFAULT_RETRY_AFTER),
+        )
+
+        if interval := config.getfloat(
+            "argon2", "stats-interval", fallback=DEFAULT_STATS_INTERVAL
+        ):
+            PeriodicTask(_POOL.report, interval, "argon2-stats").start()
+
+    return _POOL
+
+
+def run(function: Callable[..., Any], *args) -> Any:
+    """Runs the function on the process-wide hashing pool."""
+
+    return get_pool().run(function, *args)
+
+
+def get_max_hash_length() -> int:
+    """Returns the maximum length of encoded hashes."""
+
+    return get_config().getint("argon2", "max-hash-length", fallback=MAX_HASH_LENGTH)
+
+
+def hash_length(hasher: PasswordHasher) -> int:
+    """Returns the length of the hasher's encoded hashes."""
+
+    return len(hasher.hash(""))
+
+
+@cache
+def get_hasher() -> PasswordHasher:
+    """Returns a password hasher with the parameters from his.conf.
+
+    Raises ValueError if its encoded hashes exceed [argon2] max-hash-length,
+    i.e. would not fit into the accounts' passwd column.
+    """
+
+    config = get_config()
+    default = PasswordHasher()
+    hasher = PasswordHasher(
+        time_cost=config.getint("argon2", "time-cost", fallback=default.time_cost),
+        memory_cost=config.getint(
+            "argon2", "memory-cost", fallback=default.memory_cost
+        ),
+        parallelism=config.getint(
+            "argon2", "parallelism", fallback=default.parallelism
+        ),
+    )
+
+    if (length := hash_length(hasher)) > (maximum := get_max_hash_length()):
+        raise ValueError(
+            f"Argon2 hashes with the configured parameters have {length} "
+            f"characters, but the passwd column only holds {maximum}."
+        )
+
+    return hasher
+
+
+HASHER = get_hasher()
+
+
+def measure(hasher: PasswordHasher, rounds: int) -> float:
+    """Returns the average hashing latency of the hasher in seconds."""
+
+    start = perf_counter()
+
+    for _ in range(rounds):
+        hasher.hash("calibration")
+
+    return (perf_counter() - start) / rounds
+
+
+def calibrate(
+    target: float, memory_costs: list[int], parallelism: int, rounds: int = 3
+) -> Iterator[Calibration]:
+    """Yields the smallest time cost per memory cost
+    whose hashing latency reaches the target latency.
+    """
+
+    for memory_cost in memory_costs:
+        time_cost = 1
+
+        while True:
+            hasher = PasswordHasher(
+                time_cost=time_cost,
+                memory_cost=memory_cost,
+                parallelism=parallelism,
+            )
+
+            if (latency := measure(hasher, rounds)) >= target:
+                break
+
+            if time_cost >= MAX_TIME_COST:
+                break
+
+            time_cost += 1
+
+        yield Calibration(
+            time_cost, memory_cost, parallelism, latency, hash_length(hasher)
+        )
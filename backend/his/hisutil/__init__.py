@@ -4,9 +4,12 @@ from logging import DEBUG, INFO, basicConfig
 
 from his.hisutil.account import add_account
 from his.hisutil.argparse import get_args
+from his.hisutil.hashing import calibrate_argon2
+from his.hisutil.permissions import build_index
 from his.hisutil.service import add_account_service
 from his.hisutil.service import add_customer_service
 from his.hisutil.service import add_service
+from his.hisutil.service import list_schedule
 from his.hisutil.session import cleanup
 
 
@@ -32,5 +35,13 @@ def main():
             add_customer_service(args)
         elif args.action == "account":
             add_account_service(args)
+        elif args.action == "schedule":
+            list_schedule(args)
+    elif args.target == "argon2":
+        if args.action == "calibrate":
+            calibrate_argon2(args)
+    elif args.target == "permissions":
+        if args.action == "index":
+            build_index(args)
     elif args.target == "session-cleanup":
-        cleanup()
+        cleanup(args)
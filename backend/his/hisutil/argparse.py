@@ -5,6 +5,7 @@ from datetime import datetime
 
 from mdb import customer
 
+from his.orm.session import CLEANUP_CHUNK_SIZE
 from his.parsers import account, service
 
 
@@ -66,6 +67,89 @@ def _add_service_parser(subparsers):
     add_account_parser.add_argument(
         "account", type=account, help="the account ID, name or email"
     )
+    schedule_parser = subparsers_.add_parser(
+        "schedule", help="list upcoming activations and expirations"
+    )
+    schedule_parser.add_argument(
+        "-d",
+        "--days",
+        type=float,
+        default=30,
+        help="how many days to look ahead (default: 30)",
+    )
+
+
+def _add_argon2_parser(subparsers):
+    """Adds a parser for Argon2 settings."""
+
+    parser = subparsers.add_parser("argon2", help="manage password hashing")
+    subparsers_ = parser.add_subparsers(dest="action")
+    calibrate_parser = subparsers_.add_parser(
+        "calibrate", help="propose parameters for this host"
+    )
+    calibrate_parser.add_argument(
+        "-t",
+        "--target",
+        type=int,
+        default=250,
+        help="the target latency per hash in milliseconds",
+    )
+    calibrate_parser.add_argument(
+        "-m",
+        "--memory-cost",
+        type=int,
+        action="append",
+        help="memory cost in KiB to try (may be given multiple times)",
+    )
+    calibrate_parser.add_argument(
+        "-p", "--parallelism", type=int, default=4, help="the amount of lanes"
+    )
+    calibrate_parser.add_argument(
+        "-r", "--rounds", type=int, default=3, help="hashes to average per setting"
+    )
+
+
+def _add_permissions_parser(subparsers):
+    """Adds a parser for the permission index."""
+
+    parser = subparsers.add_parser("permissions", help="manage permissions")
+    subparsers_ = parser.add_subparsers(dest="action")
+    index_parser = subparsers_.add_parser(
+        "index", help="build the bitset permission index"
+    )
+    index_parser.add_argument(
+        "file", nargs="?", help="the index file (defaults to [permissions] index-file)"
+    )
+
+
+def _add_session_cleanup_parser(subparsers):
+    """Adds a parser for cleaning up sessions."""
+
+    parser = subparsers.add_parser("session-cleanup", help="cleanup dead sessions")
+    parser.add_argument(
+        "-d", "--daemon", action="store_true", help="keep reaping in the background"
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=60,
+        help="seconds between cleanup runs in daemon mode",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=int,
+        default=CLEANUP_CHUNK_SIZE,
+        help="maximum amount of sessions to delete per statement",
+    )
+    parser.add_argument(
+        "-p",
+        "--pause",
+        type=float,
+        default=0,
+        help="seconds to sleep between chunks",
+    )
 
 
 def get_args() -> Namespace:
@@ -78,5 +162,7 @@ def get_args() -> Namespace:
     subparsers = parser.add_subparsers(dest="target")
     _add_account_parser(subparsers)
     _add_service_parser(subparsers)
-    subparsers.add_parser("session-cleanup", help="cleanup dead sessions")
+    _add_argon2_parser(subparsers)
+    _add_permissions_parser(subparsers)
+    _add_session_cleanup_parser(subparsers)
     return parser.parse_args()
@@ -0,0 +1,53 @@
+"""Password hashing calibration."""
+
+from argparse import Namespace
+from logging import getLogger
+
+from argon2 import PasswordHasher
+
+from his.hashing import calibrate, get_max_hash_length
+
+
+__all__ = ["calibrate_argon2"]
+
+
+LOGGER = getLogger("hisutil")
+
+
+def calibrate_argon2(args: Namespace):
+    """Proposes Argon2 parameters for the target latency."""
+
+    LOGGER.info("Calibrating for %i ms per hash.", args.target)
+    memory_costs = args.memory_cost or [PasswordHasher().memory_cost]
+    max_length = get_max_hash_length()
+    calibrations = []
+
+    for calibration in calibrate(
+        args.target / 1000, memory_costs, args.parallelism, rounds=args.rounds
+    ):
+        LOGGER.info(
+            "memory_cost=%i KiB: time_cost=%i (%.1f ms, %i characters)",
+            calibration.memory_cost,
+            calibration.time_cost,
+            calibration.latency * 1000,
+            calibration.length,
+        )
+
+        if calibration.length > max_length:
+            LOGGER.warning(
+                "Skipping hashes longer than the passwd column (%i).", max_length
+            )
+            continue
+
+        calibrations.append(calibration)
+
+    if not calibrations:
+        LOGGER.error("No parameters fit into the passwd column.")
+        return
+
+    best = min(calibrations, key=lambda item: abs(item.latency * 1000 - args.target))
+
+    print("[argon2]")
+    print(f"time-cost = {best.time_cost}")
+    print(f"memory-cost = {best.memory_cost}")
+    print(f"parallelism = {best.parallelism}")
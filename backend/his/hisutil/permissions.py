@@ -0,0 +1,33 @@
+"""Permission index management."""
+
+from argparse import Namespace
+from logging import getLogger
+
+from his.config import get_config
+from his.permissions import PermissionIndex
+
+
+__all__ = ["build_index"]
+
+
+LOGGER = getLogger("hisutil")
+
+
+def build_index(args: Namespace):
+    """Builds the bitset permission index and writes it to a file."""
+
+    path = args.file or get_config().get("permissions", "index-file", fallback=None)
+
+    if path is None:
+        LOGGER.error("No index file specified.")
+        return
+
+    index = PermissionIndex.build()
+    index.save(path)
+    LOGGER.info(
+        "Indexed %i services, %i customers and %i accounts to %s.",
+        len(index.services),
+        len(index.customers),
+        len(index.accounts),
+        path,
+    )
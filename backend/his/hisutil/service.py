@@ -1,6 +1,7 @@
 """Handles services."""
 
 from argparse import Namespace
+from datetime import datetime, timedelta
 from logging import getLogger
 from sys import exit  # pylint: disable=W0622
 
@@ -9,7 +10,12 @@ from peewee import IntegrityError
 from his.orm import AccountService, CustomerService, Service
 
 
-__all__ = ["add_service", "add_customer_service", "add_account_service"]
+__all__ = [
+    "add_service",
+    "add_customer_service",
+    "add_account_service",
+    "list_schedule",
+]
 
 
 LOGGER = getLogger("hisutil")
@@ -57,3 +63,36 @@ def add_account_service(args: Namespace):
         account_service.save()
 
     LOGGER.info("Added: %s", account_service)
+
+
+def list_schedule(args: Namespace):
+    """Lists upcoming activations and expirations of customer services."""
+
+    now = datetime.now()
+    until = None if args.days is None else now + timedelta(days=args.days)
+    changes = []
+
+    for customer, service, begin, end in (
+        CustomerService.changes(
+            CustomerService.customer,
+            CustomerService.service,
+            CustomerService.begin,
+            CustomerService.end,
+            since=now,
+            until=until,
+        )
+        .tuples()
+        .iterator()
+    ):
+        for time, event in ((begin, "activates"), (end, "expires")):
+            if time is not None and now < time and (until is None or time <= until):
+                changes.append((time, event, customer, service))
+
+    if not changes:
+        LOGGER.info("No upcoming changes.")
+        return
+
+    for time, event, customer, service in sorted(changes):
+        LOGGER.info(
+            "%s %s %s@%s", time.isoformat(), event, customer, Service.lookup(service)
+        )
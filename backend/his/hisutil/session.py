@@ -1,6 +1,8 @@
 """Session management."""
 
+from argparse import Namespace
 from logging import getLogger
+from time import sleep
 
 from his.orm import Session
 
@@ -11,12 +13,43 @@ __all__ = ["cleanup"]
 LOGGER = getLogger("hisutil")
 
 
-def cleanup():
+def cleanup(args: Namespace):
     """Cleans up orphaned sessions."""
 
-    count = Session.cleanup()
+    if args.daemon:
+        reap(args)
+        return
+
+    count = Session.cleanup(chunk_size=args.chunk_size, pause=args.pause)
 
     if count:
         LOGGER.info("Deleted %i orphaned sessions.", count)
     else:
         LOGGER.info("Nothing to do.")
+
+
+def reap(args: Namespace):
+    """Continuously cleans up orphaned sessions.
+
+    Errors are logged and the next cycle is tried after the interval.
+    """
+
+    LOGGER.info("Reaping orphaned sessions every %.1f seconds.", args.interval)
+    total = 0
+
+    try:
+        while True:
+            try:
+                count = Session.cleanup(chunk_size=args.chunk_size, pause=args.pause)
+            except Exception:  # pylint: disable=W0703
+                LOGGER.exception("Could not delete orphaned sessions.")
+            else:
+                if count:
+                    total += count
+                    LOGGER.info(
+                        "Deleted %i orphaned sessions (%i total).", count, total
+                    )
+
+            sleep(args.interval)
+    except KeyboardInterrupt:
+        LOGGER.info("Stopped after deleting %i orphaned sessions.", total)
@@ -0,0 +1,188 @@
+"""Customer logo delivery.
+
+Logos are identified by their file's SHA-256 checksum,
+which doubles as a strong entity tag for HTTP caching.
+Hot logos are kept in a size-bounded in-process LRU cache.
+
+Optionally, logos are written once to a content-addressed directory
+and delivered by the web server, configured in his.conf:
+
+    [logo]
+    offload = X-Accel-Redirect | X-Sendfile
+    directory = /var/cache/his/logos
+    location = /logos/
+    mode = 644
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from glob import glob
+from logging import getLogger
+from mimetypes import guess_extension
+from os import chmod, makedirs, replace, unlink
+from os.path import exists, join
+from tempfile import NamedTemporaryFile
+from typing import NamedTuple, Optional
+
+from flask import Response
+
+from filedb import File
+
+from his.cache import LRUCache
+from his.config import get_config
+
+
+__all__ = [
+    "Logo",
+    "evict_logo",
+    "get_logo_bytes",
+    "get_offload",
+    "offload",
+]
+
+
+DEFAULT_CACHE_SIZE = 64
+DEFAULT_DIRECTORY = "/var/cache/his/logos"
+DEFAULT_LOCATION = "/logos/"
+DEFAULT_MAX_SIZE = 1024 * 1024
+DEFAULT_MODE = "644"
+LOGGER = getLogger("his.logos")
+OFFLOAD_HEADERS = {"X-Accel-Redirect", "X-Sendfile"}
+TTL = 86400
+_CACHE = None
+
+
+class Logo(NamedTuple):
+    """Metadata of a customer logo."""
+
+    file: int
+    sha256sum: str
+    mimetype: str
+    created: datetime
+
+    @classmethod
+    def from_file(cls, ident: int) -> Logo:
+        """Loads the metadata of the file without reading its bytes."""
+        return cls(
+            *File.select(File.id, File.sha256sum, File.mimetype, File.created)
+            .where(File.id == ident)
+            .tuples()
+            .get()
+        )
+
+    @property
+    def filename(self) -> str:
+        """Returns the content-addressed file name."""
+        return self.sha256sum + (guess_extension(self.mimetype or "") or "")
+
+
+def get_cache() -> LRUCache:
+    """Returns the process-wide logo cache."""
+
+    global _CACHE  # pylint: disable=W0603
+
+    if _CACHE is None:
+        _CACHE = LRUCache(
+            get_config().getint("logo", "cache-size", fallback=DEFAULT_CACHE_SIZE)
+        )
+
+    return _CACHE
+
+
+def get_directory() -> str:
+    """Returns the directory of offloaded logos."""
+
+    return get_config().get("logo", "directory", fallback=DEFAULT_DIRECTORY)
+
+
+def get_mode() -> int:
+    """Returns the octal file mode of offloaded logos."""
+
+    return int(get_config().get("logo", "mode", fallback=DEFAULT_MODE), 8)
+
+
+def get_offload() -> Optional[str]:
+    """Returns the configured offload header or None."""
+
+    if (header := get_config().get("logo", "offload", fallback=None)) is None:
+        return None
+
+    if header not in OFFLOAD_HEADERS:
+        raise ValueError(f"Invalid logo offload header: {header}")
+
+    return header
+
+
+def get_logo_bytes(logo: Logo) -> bytes:
+    """Returns the logo's bytes from the cache or the file database.
+
+    Logos larger than [logo] max-size are not cached.
+    """
+
+    cache = get_cache()
+    key = f"logo:{logo.file}"
+
+    if (data := cache.get(key)) is not None:
+        return data
+
+    data = File.select(File.bytes).where(File.id == logo.file).scalar()
+
+    if len(data) <= get_config().getint("logo", "max-size", fallback=DEFAULT_MAX_SIZE):
+        cache.set(key, data, TTL)
+
+    return data
+
+
+def store(logo: Logo) -> str:
+    """Writes the logo to the offload directory unless
+    it is already there and returns its path.
+    """
+
+    directory = get_directory()
+
+    if exists(path := join(directory, logo.filename)):
+        return path
+
+    makedirs(directory, exist_ok=True)
+
+    with NamedTemporaryFile("wb", dir=directory, delete=False) as tmp:
+        tmp.write(get_logo_bytes(logo))
+
+    # Temporary files are private, but the web server needs to read the logo.
+    chmod(tmp.name, get_mode())
+    replace(tmp.name, path)
+    return path
+
+
+def offload(logo: Logo, header: str) -> Response:
+    """Returns a response that lets the web server deliver the logo."""
+
+    path = store(logo)
+    response = Response(mimetype=logo.mimetype)
+
+    if header == "X-Accel-Redirect":
+        location = get_config().get("logo", "location", fallback=DEFAULT_LOCATION)
+        response.headers[header] = location.rstrip("/") + "/" + logo.filename
+    else:
+        response.headers[header] = path
+
+    return response
+
+
+def evict_logo(ident: int) -> None:
+    """Removes the respective logo file from the caches."""
+
+    get_cache().delete(f"logo:{ident}")
+
+    try:
+        logo = Logo.from_file(ident)
+    except File.DoesNotExist:
+        return
+
+    for path in glob(join(get_directory(), logo.sha256sum + "*")):
+        try:
+            unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as error:
+            LOGGER.warning("Could not remove stale logo %s: %s", path, error)
@@ -11,11 +11,14 @@ from peewee import DateTimeField
 from peewee import ForeignKeyField
 from peewee import IntegerField
 from peewee import Select
+from peewee import Value
 
 from mdb import Company, Customer, Address
 from peeweeplus import InvalidKeys, Argon2Field, EMailField, UserNameField
 
+from his.cache import invalidate_account
 from his.exceptions import AccountLocked
+from his.hashing import HASHER, get_hasher, run
 from his.orm.common import HISModel
 
 
@@ -37,7 +40,7 @@ class Account(HISModel):  # pylint: disable=R0902
     )
     name = UserNameField(64, unique=True)  # Login name.
     full_name = UserNameField(255, null=True)  # Optional full user name.
-    passwd = Argon2Field()
+    passwd = Argon2Field(hasher=HASHER)
     email = EMailField(64, unique=True)
     created = DateTimeField(default=datetime.now)
     deleted = DateTimeField(null=True)
@@ -50,6 +53,9 @@ class Account(HISModel):  # pylint: disable=R0902
     # Flag, whether the account is root.
     # Such accounts can do ANYTHING!
     root = BooleanField(default=False)
+    # Flag whether the account only carries the principal
+    # fields of a token or of the session cache.
+    partial = False
 
     def __int__(self):
         """Returns the account's ID."""
@@ -153,10 +159,21 @@ class Account(HISModel):  # pylint: disable=R0902
     @property
     def subjects(self) -> Select:
         """Yields accounts this account can manage."""
+        return self.select_subjects()
+
+    def select_subjects(self, *fields) -> Select:
+        """Selects accounts this account can manage.
+
+        If fields are given, only those are selected without joins.
+        """
         cls = type(self)
         condition = cls.customer == self.customer
-        select = cls.select(cls, Customer, Company)
-        select = select.join(Customer).join(Company)
+
+        if fields:
+            select = cls.select(*fields)
+        else:
+            select = cls.select(cls, Customer, Company)
+            select = select.join(Customer).join(Company)
 
         if self.root:
             return select.where(True)
@@ -176,21 +193,55 @@ class Account(HISModel):  # pylint: disable=R0902
         if not self.can_login:
             raise AccountLocked()
 
+        cls = type(self)
+
         try:
-            self.passwd.verify(passwd)
+            run(self.passwd.verify, passwd)
         except VerifyMismatchError:
+            cls.update(failed_logins=cls.failed_logins + 1).where(
+                cls.id == self.id
+            ).execute()
             self.failed_logins += 1
-            self.save()
             raise
 
-        if self.passwd.needs_rehash:
-            self.passwd = passwd
-
         self.failed_logins = 0
         self.last_login = datetime.now()
-        self.save()
+        cls.update(failed_logins=0, last_login=self.last_login).where(
+            cls.id == self.id
+        ).execute()
         return True
 
+    @property
+    def needs_rehash(self) -> bool:
+        """Determines whether the password hash uses outdated parameters."""
+        return get_hasher().check_needs_rehash(str(self.passwd))
+
+    def rehash(self, passwd: str) -> None:
+        """Re-hashes the verified password with the configured parameters."""
+        cls = type(self)
+        hashed = run(get_hasher().hash, passwd)
+        # Store the hash as is, without the field hashing it again.
+        cls.update(passwd=Value(hashed, converter=False)).where(
+            cls.id == self.id
+        ).execute()
+
+    def save(self, *args, **kwargs) -> int:
+        """Saves the account and invalidates its cached sessions and
+        permissions after the write, so that no other worker can
+        re-cache the previous state under the new version.
+        """
+        if self.partial:
+            raise ValueError("Cannot save a partial account.")
+
+        cls = type(self)
+        indexed = {cls.customer, cls.admin, cls.root} & set(self.dirty_fields)
+        result = super().save(*args, **kwargs)
+
+        if self.id is not None:
+            invalidate_account(self.id, permissions=bool(indexed))
+
+        return result
+
     def patch_json(self, json: dict, allow: set = (), **kwargs) -> None:
         """Patches the account with fields limited to allow."""
         if invalid := (set(json) - set(allow) if allow else None):
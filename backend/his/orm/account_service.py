@@ -7,6 +7,7 @@ from peewee import ForeignKeyField, Select
 
 from mdb import Company, Customer
 
+from his.cache import invalidate_account
 from his.orm.account import Account
 from his.orm.common import HISModel
 from his.orm.service import Service
@@ -49,6 +50,7 @@ class AccountService(HISModel):
         except cls.DoesNotExist:
             record = cls(account=account, service=service)
             record.save()
+            invalidate_account(record.account_id)
             return record
 
     @classmethod
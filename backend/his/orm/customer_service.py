@@ -10,6 +10,7 @@ from peewee import Select
 
 from mdb import Company, Customer
 
+from his.cache import invalidate_customer
 from his.orm.common import HISModel
 from his.orm.service import Service
 
@@ -60,15 +61,32 @@ class CustomerService(HISModel):
         record.begin = begin
         record.end = end
         record.save()
+        invalidate_customer(record.customer_id)
         return record
 
     @classmethod
-    def active(cls) -> Select:
-        """Selects active customer services."""
-        now = datetime.now()
-        condition = (cls.start >> None) | (now >= cls.end)
-        condition &= (cls.end >> None) | (now <= cls.end)
-        return cls.select().where(condition)
+    def active(cls, *fields, now: Optional[datetime] = None) -> Select:
+        """Selects customer services active at the given time."""
+        if now is None:
+            now = datetime.now()
+
+        condition = (cls.begin >> None) | (cls.begin <= now)
+        condition &= (cls.end >> None) | (cls.end > now)
+        return cls.select(*fields).where(condition)
+
+    @classmethod
+    def changes(
+        cls, *fields, since: datetime, until: Optional[datetime] = None
+    ) -> Select:
+        """Selects customer services that begin or end within the period."""
+        begins = cls.begin > since
+        ends = cls.end > since
+
+        if until is not None:
+            begins &= cls.begin <= until
+            ends &= cls.end <= until
+
+        return cls.select(*fields).where(begins | ends)
 
     @classmethod
     def select(cls, *args, cascade: bool = False) -> Select:
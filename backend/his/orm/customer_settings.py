@@ -1,10 +1,13 @@
 """Customer settings."""
 
+from typing import Union
+
 from peewee import ForeignKeyField, IntegerField
 
 from filedb import File
 from mdb import Customer
 
+from his.logos import Logo, evict_logo
 from his.orm.common import HISModel
 
 
@@ -22,3 +25,43 @@ class CustomerSettings(HISModel):
     )
     max_accounts = IntegerField(null=True, default=10)
     logo = ForeignKeyField(File, column_name="logo", null=True)
+
+    @classmethod
+    def get_logo(cls, customer: Union[Customer, int]) -> Logo:
+        """Returns the metadata of the customer's logo without reading its bytes."""
+        settings = cls.select(cls.logo).where(cls.customer == customer).get()
+
+        if settings.logo_id is None:
+            raise File.DoesNotExist()
+
+        return Logo.from_file(settings.logo_id)
+
+    def save(self, *args, **kwargs) -> int:
+        """Saves the settings and removes a replaced logo from the logo caches."""
+        cls = type(self)
+        previous = None
+
+        if {cls.logo} & set(self.dirty_fields) and self.id is not None:
+            previous = cls.select(cls.logo).where(cls.id == self.id).get().logo_id
+
+        result = super().save(*args, **kwargs)
+
+        if previous is not None and previous != self.logo_id:
+            self._evict_logo(previous)
+
+        return result
+
+    def delete_instance(self, *args, **kwargs) -> int:
+        """Deletes the settings and removes their logo from the logo caches."""
+        result = super().delete_instance(*args, **kwargs)
+
+        if self.logo_id is not None:
+            self._evict_logo(self.logo_id)
+
+        return result
+
+    @classmethod
+    def _evict_logo(cls, ident: int) -> None:
+        """Evicts the logo unless other customers still use it."""
+        if not cls.select().where(cls.logo == ident).exists():
+            evict_logo(ident)
@@ -1,15 +1,23 @@
 """HIS services."""
 
 from __future__ import annotations
+from threading import Lock
+from time import monotonic
+from typing import Union
 
 from peewee import BooleanField
 from peewee import CharField
 
+from his.config import get_config
 from his.exceptions import ServiceExistsError
 from his.orm.common import HISModel
 
 
-__all__ = ["Service"]
+__all__ = ["Service", "ServiceRegistry"]
+
+
+MISS_INTERVAL = 1
+TTL = 30
 
 
 class Service(HISModel):
@@ -34,6 +42,80 @@ class Service(HISModel):
         except cls.DoesNotExist:
             service = cls(name=name, description=description, promote=promote)
             service.save()
+            REGISTRY.clear()
             return service
 
         raise ServiceExistsError()
+
+    @classmethod
+    def lookup(cls, ident: Union[int, str]) -> Service:
+        """Returns the service by its ID or name from the registry."""
+        return REGISTRY.get(ident)
+
+    @classmethod
+    def registered(cls) -> list[Service]:
+        """Returns all services from the registry."""
+        return REGISTRY.all()
+
+
+class ServiceRegistry:
+    """Process-wide registry of all services by name and ID.
+
+    The service table is reloaded after the TTL, so that changes
+    such as the locked flag take effect within a bounded delay.
+    A lookup miss triggers a reload at most every MISS_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_id = {}
+        self.loaded = None
+        self.lock = Lock()
+
+    def all(self) -> list[Service]:
+        """Returns all services ordered by ID."""
+        with self.lock:
+            self._refresh(monotonic())
+            return [self.by_id[ident] for ident in sorted(self.by_id)]
+
+    def get(self, ident: Union[int, str]) -> Service:
+        """Returns the service by its ID or name."""
+        mapping = "by_name" if isinstance(ident, str) else "by_id"
+
+        with self.lock:
+            self._refresh(now := monotonic())
+
+            try:
+                return getattr(self, mapping)[ident]
+            except KeyError:
+                if now - self.loaded < MISS_INTERVAL:
+                    raise Service.DoesNotExist() from None
+
+            self._load(now)
+
+            try:
+                return getattr(self, mapping)[ident]
+            except KeyError:
+                raise Service.DoesNotExist() from None
+
+    def clear(self) -> None:
+        """Forces a reload on next access."""
+        with self.lock:
+            self.loaded = None
+
+    def _refresh(self, now: float) -> None:
+        """Reloads the services if they are outdated."""
+        ttl = get_config().getfloat("services", "ttl", fallback=TTL)
+
+        if self.loaded is None or now - self.loaded >= ttl:
+            self._load(now)
+
+    def _load(self, now: float) -> None:
+        """Loads all services."""
+        services = list(Service.select())
+        self.by_name = {service.name: service for service in services}
+        self.by_id = {service.id: service for service in services}
+        self.loaded = now
+
+
+REGISTRY = ServiceRegistry()
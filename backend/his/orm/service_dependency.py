@@ -1,14 +1,22 @@
 """Service dependencies."""
 
-from typing import Iterator, Union
+from __future__ import annotations
+from typing import Iterable, Iterator, Union
 
+from peewee import CTE
+from peewee import Cast
 from peewee import ForeignKeyField
+from peewee import Value
+from peewee import fn
 
 from his.orm.common import HISModel
 from his.orm.service import Service
 
 
-__all__ = ["ServiceDependency"]
+__all__ = ["MAX_DEPTH", "ServiceDependency"]
+
+
+MAX_DEPTH = 32
 
 
 class ServiceDependency(HISModel):
@@ -29,8 +37,28 @@ class ServiceDependency(HISModel):
     )
 
     @classmethod
-    def deps(cls, service: Union[Service, int]) -> Iterator[Service]:
-        """Yields all dependencies of a service recursively."""
+    def deps(
+        cls,
+        service: Union[Service, int],
+        *,
+        recursive: bool = False,
+        max_depth: int = MAX_DEPTH,
+    ) -> Iterator[Service]:
+        """Yields all dependencies of a service recursively.
+
+        If recursive is True, all dependencies are
+        selected with a single recursive query.
+        """
+        if recursive:
+            cte = cls.closure_cte([service], max_depth=max_depth)
+            yield from (
+                Service.select()
+                .join(cte, on=Service.id == cte.c.dependency)
+                .with_cte(cte)
+                .distinct()
+            )
+            return
+
         dependency = Service.alias()
         select = (
             cls.select(cls, Service, dependency)
@@ -41,3 +69,60 @@ class ServiceDependency(HISModel):
         for service_dependency in select.where(cls.service == service):
             yield service_dependency.dependency
             yield from cls.deps(service_dependency.dependency)
+
+    @classmethod
+    def closure(
+        cls,
+        services: Iterable[Union[Service, int]],
+        *,
+        max_depth: int = MAX_DEPTH,
+    ) -> dict[int, frozenset[int]]:
+        """Returns the IDs of all transitive dependencies
+        of the given services in one query, keyed by service ID.
+        """
+        closure = {
+            service if isinstance(service, int) else service.id: set()
+            for service in services
+        }
+
+        if not closure:
+            return {}
+
+        cte = cls.closure_cte(closure, max_depth=max_depth)
+
+        for root, dependency in cte.select_from(cte.c.root, cte.c.dependency).tuples():
+            closure[root].add(dependency)
+
+        return {root: frozenset(ids) for root, ids in closure.items()}
+
+    @classmethod
+    def closure_cte(
+        cls, services: Iterable[Union[Service, int]], *, max_depth: int = MAX_DEPTH
+    ) -> CTE:
+        """Returns a recursive CTE of (root, dependency, depth, path).
+
+        The path lists the visited service IDs, so that
+        cycles are not followed, and depth is limited to max_depth.
+        """
+        path = fn.CONCAT(",", cls.service, ",", cls.dependency, ",")
+        anchor = cls.select(
+            cls.service, cls.dependency, Value(1), Cast(path, "CHAR(1024)")
+        ).where(cls.service.in_(list(services)))
+        cte = anchor.cte(
+            "service_closure",
+            recursive=True,
+            columns=("root", "dependency", "depth", "path"),
+        )
+        edge = cls.alias()
+        visited = fn.LOCATE(fn.CONCAT(",", edge.dependency, ","), cte.c.path)
+        recursive = (
+            edge.select(
+                cte.c.root,
+                edge.dependency,
+                cte.c.depth + 1,
+                fn.CONCAT(cte.c.path, edge.dependency, ","),
+            )
+            .join(cte, on=edge.service == cte.c.dependency)
+            .where((cte.c.depth < max_depth) & (visited == 0))
+        )
+        return cte.union_all(recursive)
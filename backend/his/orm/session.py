@@ -1,12 +1,16 @@
 """User sessions."""
 
 from __future__ import annotations
+from atexit import register
 from datetime import datetime, timedelta
 from logging import getLogger
+from threading import Lock
+from time import monotonic, sleep
 from typing import NamedTuple, Optional, Union
 
 from argon2.exceptions import VerifyMismatchError
 from peewee import BooleanField
+from peewee import Case
 from peewee import DateTimeField
 from peewee import ForeignKeyField
 from peewee import Select
@@ -14,18 +18,108 @@ from peewee import Select
 from mdb import Company, Customer
 from peeweeplus import Argon2Field
 
-from his.crypto import genpw
+from his.cache import update_session
+from his.config import get_config
+from his.crypto import genpw, is_keyed_hash, keyed_hash, verify_keyed_hash
 from his.exceptions import AccountLocked
 from his.orm.account import Account
 from his.orm.common import HISModel
+from his.periodic import PeriodicTask
 
 
-__all__ = ["DURATION", "DURATION_RANGE", "Session"]
+__all__ = [
+    "CLEANUP_CHUNK_SIZE",
+    "DURATION",
+    "DURATION_RANGE",
+    "Session",
+    "flush_renewals",
+]
 
 
 DURATION = 720
 DURATION_RANGE = range(720)
+CLEANUP_CHUNK_SIZE = 1000
 LOGGER = getLogger("his.session")
+RENEWAL_INTERVAL = 10
+RENEWAL_THRESHOLD = 60
+
+
+def get_session_key() -> Optional[bytes]:
+    """Returns the server key for keyed session secret hashes."""
+
+    if key := get_config().get("auth", "session-key", fallback=None):
+        return key.encode()
+
+    return None
+
+
+def hash_secret(secret: str) -> str:
+    """Returns the value to store for a new session secret.
+
+    If a session key is configured, this is a keyed hash.
+    Otherwise the plain secret is returned to be hashed
+    with Argon2 by the field.
+    """
+
+    if (key := get_session_key()) is None:
+        return secret
+
+    return keyed_hash(secret, key)
+
+
+def get_renewal_threshold() -> timedelta:
+    """Returns the minimum change of a session's end to be written."""
+
+    return timedelta(
+        seconds=get_config().getint(
+            "session", "renewal-threshold", fallback=RENEWAL_THRESHOLD
+        )
+    )
+
+
+def is_write_behind() -> bool:
+    """Determines whether session renewals are written behind."""
+
+    mode = get_config().get("session", "renewal-mode", fallback="sync")
+    return mode == "write-behind"
+
+
+class SessionSecretAccessor(Argon2Field.accessor_class):
+    """Passes keyed hashes through instead of hashing them with Argon2."""
+
+    def __get__(self, instance, instance_type=None):
+        if instance is not None:
+            if is_keyed_hash(value := instance.__data__.get(self.name)):
+                return value
+
+        return super().__get__(instance, instance_type)
+
+    def __set__(self, instance, value):
+        if is_keyed_hash(value):
+            instance.__data__[self.name] = value
+            instance._dirty.add(self.name)  # pylint: disable=W0212
+        else:
+            super().__set__(instance, value)
+
+
+class SessionSecretField(Argon2Field):
+    """Stores session secrets as keyed hashes or as Argon2 hashes."""
+
+    accessor_class = SessionSecretAccessor
+
+    def db_value(self, value):
+        """Stores keyed hashes verbatim."""
+        if is_keyed_hash(value):
+            return value
+
+        return super().db_value(value)
+
+    def python_value(self, value):
+        """Returns keyed hashes verbatim."""
+        if is_keyed_hash(value):
+            return value
+
+        return super().python_value(value)
 
 
 class Session(HISModel):
@@ -38,10 +132,14 @@ class Session(HISModel):
         on_delete="CASCADE",
         lazy_load=False,
     )
-    secret = Argon2Field()
+    secret = SessionSecretField()
     start = DateTimeField()
     end = DateTimeField()
     login = BooleanField(default=True)
+    # Flag whether the session was restored from a signed token.
+    stateless = False
+    # Flag whether the session only carries its principal fields.
+    partial = False
 
     @classmethod
     def add(cls, account: Union[Account, int], duration: timedelta) -> NewSession:
@@ -49,10 +147,32 @@ class Session(HISModel):
         start = datetime.now()
         end = start + duration
         secret = genpw(length=32)
-        session = cls(account=account, secret=secret, start=start, end=end)
+        session = cls(
+            account=account, secret=hash_secret(secret), start=start, end=end
+        )
         session.save()
         return NewSession(session=session, secret=secret)
 
+    @classmethod
+    def restore(
+        cls, session: dict, account: dict, *, stateless: bool = False
+    ) -> Session:
+        """Restores a partial session from its and its account's principal fields.
+
+        Partial sessions, accounts and customers must neither
+        be saved nor serialized as complete records.
+        """
+        customer = Customer(__no_default__=1, id=account["customer"])
+        customer.partial = True
+        account = Account(__no_default__=1, **{**account, "customer": customer})
+        account._dirty.clear()  # pylint: disable=W0212
+        account.partial = True
+        session = cls(__no_default__=1, account=account, **session)
+        session._dirty.clear()  # pylint: disable=W0212
+        session.partial = True
+        session.stateless = stateless
+        return session
+
     @classmethod
     def open(cls, account: Union[Account, int], duration: int = DURATION) -> NewSession:
         """Actually opens a new login session."""
@@ -62,20 +182,47 @@ class Session(HISModel):
         return NewSession(session=session, secret=secret)
 
     @classmethod
-    def cleanup(cls, before: Optional[datetime] = None) -> int:
-        """Cleans up orphaned sessions."""
-        count = 0
+    def cleanup(
+        cls,
+        before: Optional[datetime] = None,
+        *,
+        chunk_size: int = CLEANUP_CHUNK_SIZE,
+        pause: float = 0,
+    ) -> int:
+        """Cleans up orphaned sessions.
 
+        Sessions are deleted in chunks of at most chunk_size rows
+        in ID order, so that the statements are deterministic for
+        statement-based replication, optionally sleeping pause
+        seconds between the chunks.
+        """
         if before is None:
             before = datetime.now()
 
-        sessions = cls.select().where(cls.end < before)
+        total = 0
+        start = monotonic()
 
-        for count, session in enumerate(sessions, start=1):
-            session.delete_instance()
-            LOGGER.info("Cleaned up session: %s", session)
+        while True:
+            count = (
+                cls.delete()
+                .where(cls.end < before)
+                .order_by(cls.id)
+                .limit(chunk_size)
+                .execute()
+            )
+            total += count
+            LOGGER.debug(
+                "Deleted %i sessions (%i total, %.1f/s).",
+                count,
+                total,
+                total / max(monotonic() - start, 1e-6),
+            )
 
-        return count
+            if count < chunk_size:
+                return total
+
+            if pause > 0:
+                sleep(pause)
 
     @classmethod
     def select(cls, *args, cascade: bool = False) -> Select:
@@ -93,18 +240,46 @@ class Session(HISModel):
 
     def verify(self, secret: str) -> bool:
         """Verifies the session."""
+        if is_keyed_hash(self.secret):
+            if (key := get_session_key()) is None:
+                LOGGER.error("No session key configured to verify %s.", self)
+                return False
+
+            return verify_keyed_hash(self.secret, secret, key)
+
         try:
             return self.secret.verify(secret)
         except VerifyMismatchError:
             return False
 
     def renew(self, duration: int = DURATION) -> Session:
-        """Renews the session."""
+        """Renews the session.
+
+        The new end is only written if it differs from the current
+        one by at least the configured renewal threshold.
+        In write-behind mode it is queued and written in batches.
+        Stateless sessions are renewed through their database session.
+        """
+        if self.stateless:
+            return self
+
         if not self.account.can_login:
             raise AccountLocked()
 
-        self.end = datetime.now() + timedelta(minutes=duration)
-        self.save()
+        end = datetime.now() + timedelta(minutes=duration)
+
+        if abs(end - self.end) < get_renewal_threshold():
+            return self
+
+        self.end = end
+
+        if is_write_behind():
+            RENEWALS.schedule(self)
+        else:
+            cls = type(self)
+            cls.update(end=end).where(cls.id == self.id).execute()
+
+        update_session(self)
         return self
 
 
@@ -116,3 +291,62 @@ class NewSession(NamedTuple):
 
     session: Session
     secret: str
+
+
+class RenewalQueue:
+    """Collects pending session renewals and writes them in batches."""
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = Lock()
+        self.task = None
+
+    def schedule(self, session: Session) -> None:
+        """Queues the session's new end for writing."""
+        with self.lock:
+            self.pending[session.id] = session.end
+
+            if self.task is None:
+                self.task = PeriodicTask(
+                    self.flush,
+                    get_config().getfloat(
+                        "session", "renewal-interval", fallback=RENEWAL_INTERVAL
+                    ),
+                    "session-renewal",
+                )
+                self.task.start()
+                register(self.flush)
+
+    def flush(self) -> int:
+        """Writes all pending renewals in one statement."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        try:
+            Session.update(end=Case(Session.id, list(pending.items()))).where(
+                Session.id.in_(list(pending))
+            ).execute()
+        except Exception:
+            self._requeue(pending)
+            raise
+
+        LOGGER.debug("Renewed %i sessions.", len(pending))
+        return len(pending)
+
+    def _requeue(self, pending: dict) -> None:
+        """Re-queues renewals that could not be written."""
+        with self.lock:
+            for ident, end in pending.items():
+                self.pending[ident] = max(end, self.pending.get(ident, end))
+
+
+RENEWALS = RenewalQueue()
+
+
+def flush_renewals() -> int:
+    """Writes all pending session renewals."""
+
+    return RENEWALS.flush()
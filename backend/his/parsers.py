@@ -46,6 +46,6 @@ def service(string: str) -> Service:
     """Returns the respective service."""
 
     try:
-        return Service.get(Service.name == string)
+        return Service.lookup(string)
     except Service.DoesNotExist:
         raise ValueError("No such service.") from None
@@ -0,0 +1,33 @@
+"""Periodic background tasks."""
+
+from logging import getLogger
+from threading import Event, Thread
+from typing import Callable
+
+
+__all__ = ["PeriodicTask"]
+
+
+LOGGER = getLogger("his.periodic")
+
+
+class PeriodicTask(Thread):
+    """Runs a function periodically in a daemon thread."""
+
+    def __init__(self, function: Callable[[], None], interval: float, name: str):
+        super().__init__(name=name, daemon=True)
+        self.function = function
+        self.interval = interval
+        self.stopped = Event()
+
+    def run(self):
+        """Runs the function until the task is stopped."""
+        while not self.stopped.wait(self.interval):
+            try:
+                self.function()
+            except Exception:  # pylint: disable=W0703
+                LOGGER.exception("Periodic task %s failed.", self.name)
+
+    def stop(self) -> None:
+        """Stops the task."""
+        self.stopped.set()
@@ -0,0 +1,434 @@
+"""Bitset-backed permission index.
+
+Every service is mapped to a bit. Each customer has a mask of its
+active, dependency-expanded services and each account has a mask of
+its dependency-expanded account services, so that checking a
+permission reduces to (customer_mask & account_mask) >> bit & 1.
+
+Indices are versioned with a fingerprint of the tables they are built
+from, so that workers can load a current index file written by hisutil.
+Indices are checked and replaced in a background thread. While an index
+is outdated by a permission-relevant invalidation or a customer service
+change, no index is returned and callers fall back to the cached
+effective services.
+"""
+
+from __future__ import annotations
+from functools import reduce
+from hashlib import sha256
+from logging import getLogger
+from operator import or_
+from os import replace
+from os.path import getmtime
+from struct import Struct
+from threading import Lock, Thread
+from time import monotonic, time
+from typing import Iterable, NamedTuple, Optional
+from zlib import compress, decompress
+
+from peewee import fn
+
+from his.cache import get_permissions_version
+from his.config import get_config
+from his.dependencies import get_graph, get_version
+from his.orm.account import Account
+from his.orm.account_service import AccountService
+from his.orm.customer_service import CustomerService
+from his.orm.service import Service
+from his.schedule import ActivationSchedule
+
+
+__all__ = ["PermissionIndex", "get_fingerprint", "get_index"]
+
+
+ADMIN = 1
+ROOT = 2
+CHECK_INTERVAL = 10
+FORMAT_VERSION = 1
+LOGGER = getLogger("his.permissions")
+HEADER = Struct("<Bd8sIII")  # Format, expiry, version, services, customers, accounts.
+ACCOUNT = Struct("<IIB")  # Account ID, customer ID, flags.
+CUSTOMER = Struct("<I")  # Customer ID.
+SERVICE = Struct("<I")  # Service ID.
+TTL = 300
+
+
+class AccountEntry(NamedTuple):
+    """An account's customer, flags and service mask."""
+
+    customer: int
+    flags: int
+    mask: int
+
+
+class PermissionIndex:
+    """Permission masks of all customers and accounts."""
+
+    def __init__(
+        self,
+        services: list[int],
+        customers: dict[int, int],
+        accounts: dict[int, AccountEntry],
+        expires: Optional[float] = None,
+        version: bytes = b"",
+    ):
+        self.services = services
+        self.bits = {service: bit for bit, service in enumerate(services)}
+        self.customers = customers
+        self.accounts = accounts
+        self.expires = expires
+        self.version = version
+        self.created = time()
+
+    def __contains__(self, account: int) -> bool:
+        return account in self.accounts
+
+    def can_use(self, account: int, service: int) -> bool:
+        """Checks whether the account can use the service."""
+        entry = self.accounts[account]
+
+        if entry.flags & ROOT:
+            return True
+
+        if (bit := self.bits.get(service)) is None:
+            return False
+
+        return bool((self.customers.get(entry.customer, 0) & entry.mask) >> bit & 1)
+
+    def services_of(self, account: int) -> frozenset[int]:
+        """Returns the IDs of all services the account can use."""
+        entry = self.accounts[account]
+
+        if entry.flags & ROOT:
+            return frozenset(self.services)
+
+        mask = self.customers.get(entry.customer, 0) & entry.mask
+        return frozenset(
+            service for bit, service in enumerate(self.services) if mask >> bit & 1
+        )
+
+    def accounts_for(
+        self, service: int, accounts: Optional[Iterable[int]] = None
+    ) -> list[int]:
+        """Returns the IDs of the accounts that can use the service.
+
+        If accounts is given, only those are checked.
+        """
+        if accounts is None:
+            accounts = self.accounts
+
+        if (bit := self.bits.get(service)) is None:
+            return [
+                account
+                for account in accounts
+                if (entry := self.accounts.get(account)) and entry.flags & ROOT
+            ]
+
+        customers = {
+            customer for customer, mask in self.customers.items() if mask >> bit & 1
+        }
+        return [
+            account
+            for account in accounts
+            if (entry := self.accounts.get(account)) is not None
+            and (
+                entry.flags & ROOT
+                or (entry.customer in customers and entry.mask >> bit & 1)
+            )
+        ]
+
+    @property
+    def expired(self) -> bool:
+        """Determines whether a CustomerService window has changed since."""
+        return self.expires is not None and self.expires <= time()
+
+    @classmethod
+    def build(cls, version: Optional[bytes] = None) -> PermissionIndex:
+        """Builds the index from the mapping tables.
+
+        If no version is given, the tables' current fingerprint is used.
+        """
+        if version is None:
+            version = get_fingerprint()
+
+        schedule = ActivationSchedule.load()
+        graph = get_graph()
+        services = [service.id for service in Service.select(Service.id)]
+        bits = {service: 1 << bit for bit, service in enumerate(services)}
+        full = (1 << len(services)) - 1
+        expanded = {
+            service: bits[service]
+            | sum(bits.get(dep, 0) for dep in graph.dependencies(service))
+            for service in services
+        }
+        customers = {
+            customer: reduce(or_, (expanded.get(ident, 0) for ident in active), 0)
+            for customer, active in schedule.active.items()
+        }
+        account_masks = {}
+
+        for account, service in AccountService.select(
+            AccountService.account, AccountService.service
+        ).tuples():
+            account_masks[account] = account_masks.get(account, 0) | expanded.get(
+                service, 0
+            )
+
+        accounts = {}
+
+        for account, customer, admin, root in Account.select(
+            Account.id, Account.customer, Account.admin, Account.root
+        ).tuples():
+            flags = (ADMIN if admin else 0) | (ROOT if root else 0)
+            mask = full if admin else account_masks.get(account, 0)
+            accounts[account] = AccountEntry(customer, flags, mask)
+
+        expires = schedule.next_change
+        return cls(
+            services,
+            customers,
+            accounts,
+            expires=None if expires is None else expires.timestamp(),
+            version=version,
+        )
+
+    def dumps(self) -> bytes:
+        """Serializes the index compactly."""
+        size = (len(self.services) + 7) // 8
+        chunks = [
+            HEADER.pack(
+                FORMAT_VERSION,
+                self.expires or 0,
+                self.version,
+                len(self.services),
+                len(self.customers),
+                len(self.accounts),
+            )
+        ]
+        chunks.extend(SERVICE.pack(service) for service in self.services)
+
+        for customer, mask in self.customers.items():
+            chunks.append(CUSTOMER.pack(customer))
+            chunks.append(mask.to_bytes(size, "little"))
+
+        for account, entry in self.accounts.items():
+            chunks.append(ACCOUNT.pack(account, entry.customer, entry.flags))
+            chunks.append(entry.mask.to_bytes(size, "little"))
+
+        return compress(b"".join(chunks))
+
+    @classmethod
+    def loads(cls, data: bytes) -> PermissionIndex:
+        """Deserializes an index."""
+        data = decompress(data)
+        (
+            fmt,
+            expires,
+            version,
+            services,
+            customers,
+            accounts,
+        ) = HEADER.unpack_from(data)
+
+        if fmt != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format: {fmt}")
+
+        offset = HEADER.size
+        size = (services + 7) // 8
+        service_ids = []
+
+        for _ in range(services):
+            service_ids.append(SERVICE.unpack_from(data, offset)[0])
+            offset += SERVICE.size
+
+        customer_masks = {}
+
+        for _ in range(customers):
+            (customer,) = CUSTOMER.unpack_from(data, offset)
+            offset += CUSTOMER.size
+            customer_masks[customer] = int.from_bytes(
+                data[offset : offset + size], "little"
+            )
+            offset += size
+
+        account_entries = {}
+
+        for _ in range(accounts):
+            account, customer, flags = ACCOUNT.unpack_from(data, offset)
+            offset += ACCOUNT.size
+            mask = int.from_bytes(data[offset : offset + size], "little")
+            account_entries[account] = AccountEntry(customer, flags, mask)
+            offset += size
+
+        return cls(
+            service_ids,
+            customer_masks,
+            account_entries,
+            expires=expires or None,
+            version=version if any(version) else b"",
+        )
+
+    def save(self, path: str) -> None:
+        """Atomically writes the index to a file."""
+        with open(tmp := f"{path}.tmp", "wb") as file:
+            file.write(self.dumps())
+
+        replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> PermissionIndex:
+        """Loads the index from a file."""
+        with open(path, "rb") as file:
+            index = cls.loads(file.read())
+
+        index.created = getmtime(path)
+        return index
+
+
+class CachedIndex:
+    """Holds the process-wide index."""
+
+    def __init__(self):
+        self.index = None
+        self.version = None  # Permissions cache version of the last check.
+        self.checked = 0
+        self.lock = Lock()
+        self.thread = None
+
+    def get(self) -> Optional[PermissionIndex]:
+        """Returns a current index or None.
+
+        The index is checked against the tables' fingerprint every
+        [permissions] check-interval seconds and after permission-relevant
+        invalidations, and replaced after its TTL, at the next begin or
+        end of a customer service and if the fingerprint has changed.
+        Checks and replacements run in the background, meanwhile an index
+        due for a check is still returned, unless it is outdated.
+        """
+        config = get_config()
+        ttl = config.getfloat("permissions", "ttl", fallback=TTL)
+        interval = config.getfloat(
+            "permissions", "check-interval", fallback=CHECK_INTERVAL
+        )
+        version = get_permissions_version()
+
+        with self.lock:
+            index = self.index
+            current = (
+                index is not None and not index.expired and self.version == version
+            )
+
+            if (
+                not current
+                or monotonic() - self.checked >= interval
+                or time() - index.created >= ttl
+            ):
+                self._refresh(version)
+
+        return index if current else None
+
+    def _refresh(self, version: bytes) -> None:
+        """Starts checking the index unless that is already under way."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.thread = Thread(
+            target=self._check, args=(version,), name="permission-index", daemon=True
+        )
+        self.thread.start()
+
+    def _check(self, version: bytes) -> None:
+        """Replaces the index if it is stale."""
+        ttl = get_config().getfloat("permissions", "ttl", fallback=TTL)
+
+        try:
+            fingerprint = get_fingerprint()
+
+            if (index := self.index) is None or self._stale(index, fingerprint, ttl):
+                index = self._load(fingerprint, ttl) or PermissionIndex.build(
+                    fingerprint
+                )
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception("Could not check the permission index.")
+
+            with self.lock:
+                self.checked = monotonic()
+
+            return
+
+        with self.lock:
+            self.index = index
+            self.version = version
+            self.checked = monotonic()
+
+    def _load(self, fingerprint: bytes, ttl: float) -> Optional[PermissionIndex]:
+        """Loads the index from [permissions] index-file if that is current."""
+        config = get_config()
+
+        if (path := config.get("permissions", "index-file", fallback=None)) is None:
+            return None
+
+        try:
+            index = PermissionIndex.load(path)
+        except (OSError, ValueError):
+            return None
+
+        if self._stale(index, fingerprint, ttl):
+            return None
+
+        return index
+
+    @staticmethod
+    def _stale(index: PermissionIndex, fingerprint: bytes, ttl: float) -> bool:
+        """Checks whether the index must be replaced."""
+        return (
+            index.expired
+            or index.version != fingerprint
+            or time() - index.created >= ttl
+        )
+
+
+INDEX = CachedIndex()
+
+
+def get_fingerprint() -> bytes:
+    """Returns a cheap fingerprint of the tables the index is built from.
+
+    Changes that keep all of the aggregates are caught by the TTL.
+    """
+
+    aggregates = [
+        Service.select(fn.COUNT(Service.id), fn.MAX(Service.id)),
+        Account.select(
+            fn.COUNT(Account.id),
+            fn.MAX(Account.id),
+            fn.SUM(Account.customer),
+            fn.SUM(Account.admin),
+            fn.SUM(Account.root),
+        ),
+        AccountService.select(
+            fn.COUNT(AccountService.id),
+            fn.MAX(AccountService.id),
+            fn.SUM(AccountService.account),
+            fn.SUM(AccountService.service),
+        ),
+        CustomerService.select(
+            fn.COUNT(CustomerService.id),
+            fn.MAX(CustomerService.id),
+            fn.SUM(CustomerService.customer),
+            fn.SUM(CustomerService.service),
+            fn.COUNT(CustomerService.begin),
+            fn.COUNT(CustomerService.end),
+            fn.MAX(CustomerService.begin),
+            fn.MAX(CustomerService.end),
+        ),
+    ]
+    rows = [select.tuples().get() for select in aggregates]
+    rows.append(get_version())
+    return sha256(repr(rows).encode()).digest()[:8]
+
+
+def get_index() -> Optional[PermissionIndex]:
+    """Returns the process-wide permission index if it is current."""
+
+    return INDEX.get()
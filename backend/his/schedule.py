@@ -0,0 +1,120 @@
+"""Activation schedule of customer services.
+
+The schedule knows which services each customer has active
+and the next instant at which any of those sets changes.
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from typing import Iterable, Optional
+
+from his.cache import get_customers_version
+from his.config import get_config
+from his.orm.customer_service import CustomerService
+
+
+__all__ = ["ActivationSchedule", "get_schedule", "is_active"]
+
+
+TTL = 300
+
+
+class ActivationSchedule:
+    """Active services per customer as of a point in time."""
+
+    def __init__(
+        self,
+        rows: Iterable[tuple[int, int, Optional[datetime], Optional[datetime]]],
+        now: datetime,
+        version: bytes = b"",
+    ):
+        self.now = now
+        self.version = version
+        self.loaded = monotonic()
+        active = {}
+        changes = {}
+
+        for customer, service, begin, end in rows:
+            if is_active(begin, end, now):
+                active.setdefault(customer, set()).add(service)
+
+            for time in (begin, end):
+                if time is not None and time > now:
+                    changes[customer] = min(changes.get(customer, time), time)
+
+        self.active = {customer: frozenset(ids) for customer, ids in active.items()}
+        self.changes = changes
+        self.next_change = min(changes.values(), default=None)
+
+    def services(self, customer: int) -> tuple[frozenset[int], Optional[datetime]]:
+        """Returns the IDs of the customer's active services
+        and the next instant at which they change.
+        """
+        return self.active.get(customer, frozenset()), self.changes.get(customer)
+
+    @property
+    def expired(self) -> bool:
+        """Determines whether any customer's services have changed since."""
+        return self.next_change is not None and self.next_change <= datetime.now()
+
+    @classmethod
+    def load(cls, now: Optional[datetime] = None) -> ActivationSchedule:
+        """Loads the schedule with one query, skipping expired rows."""
+        if now is None:
+            now = datetime.now()
+
+        version = get_customers_version()
+        select = CustomerService.select(
+            CustomerService.customer,
+            CustomerService.service,
+            CustomerService.begin,
+            CustomerService.end,
+        ).where((CustomerService.end >> None) | (CustomerService.end > now))
+        return cls(select.tuples().iterator(), now, version)
+
+
+class CachedSchedule:
+    """Holds the process-wide schedule."""
+
+    def __init__(self):
+        self.schedule = None
+        self.lock = Lock()
+
+    def get(self) -> ActivationSchedule:
+        """Returns a current schedule.
+
+        The schedule is reloaded at its next change, after
+        its TTL and after any customer invalidation.
+        """
+        ttl = get_config().getfloat("schedule", "ttl", fallback=TTL)
+        version = get_customers_version()
+
+        with self.lock:
+            if (
+                self.schedule is None
+                or self.schedule.expired
+                or self.schedule.version != version
+                or monotonic() - self.schedule.loaded >= ttl
+            ):
+                self.schedule = ActivationSchedule.load()
+
+            return self.schedule
+
+
+SCHEDULE = CachedSchedule()
+
+
+def is_active(
+    begin: Optional[datetime], end: Optional[datetime], now: datetime
+) -> bool:
+    """Determines whether a begin / end window is active at the given time."""
+
+    return (begin is None or begin <= now) and (end is None or end > now)
+
+
+def get_schedule() -> ActivationSchedule:
+    """Returns the process-wide activation schedule."""
+
+    return SCHEDULE.get()
@@ -3,12 +3,18 @@
 from flask import Response
 
 from his.config import get_config
-from his.contextlocals import get_session, get_session_id, get_session_secret
+from his.contextlocals import get_current_session, get_session_secret
 from his.exceptions import NoSessionSpecified, SessionExpired
 from his.orm.session import Session
+from his.tokens import get_token_cookie, get_token_key, issue_token
 
 
-__all__ = ["set_session_cookie", "delete_session_cookie", "postprocess_response"]
+__all__ = [
+    "set_session_cookie",
+    "set_token_cookie",
+    "delete_session_cookie",
+    "postprocess_response",
+]
 
 
 def set_session_cookie(
@@ -36,6 +42,27 @@ def set_session_cookie(
             samesite="None",
         )
 
+    if (key := get_token_key()) is not None:
+        set_token_cookie(response, session, key)
+
+    return response
+
+
+def set_token_cookie(response: Response, session: Session, key: bytes) -> Response:
+    """Sets a signed session token cookie."""
+
+    token, expires = issue_token(session, key)
+
+    for domain in get_config().get("auth", "domains").split():
+        response.set_cookie(
+            get_token_cookie(),
+            token,
+            expires=expires,
+            domain=domain,
+            secure=True,
+            samesite="None",
+        )
+
     return response
 
 
@@ -45,20 +72,29 @@ def delete_session_cookie(response: Response) -> Response:
     for domain in (config := get_config()).get("auth", "domains").split():
         response.delete_cookie(config.get("auth", "session-id"), domain=domain)
         response.delete_cookie(config.get("auth", "session-secret"), domain=domain)
+        response.delete_cookie(get_token_cookie(), domain=domain)
 
     return response
 
 
 def postprocess_response(response: Response) -> Response:
-    """Sets the session cookie on the respective response."""
+    """Sets the session cookie on the respective response.
+
+    This reuses the session that has already been resolved during
+    the request, if any, including a failed resolution.
+    """
 
     # Do not override an already set session cookie i.e. on deletion.
     if "Set-Cookie" in response.headers:
         return response
 
     try:
-        session = get_session(get_session_id(), get_session_secret())
+        session = get_current_session()
     except (NoSessionSpecified, SessionExpired):
         return delete_session_cookie(response)
 
+    # Leave cookies untouched until the token expires.
+    if session.stateless:
+        return response
+
     return set_session_cookie(response, session)
@@ -0,0 +1,111 @@
+"""Login throttling.
+
+Login attempts are limited by token buckets keyed by the
+account name and by the client address before any database
+query or password hashing takes place.
+
+Buckets are updated atomically by the cache backend, so that limits
+hold across the worker processes sharing it. A bucket whose entry is
+evicted starts over full, which the backends log as a warning.
+"""
+
+from functools import partial
+from math import ceil
+from struct import Struct
+from time import time
+from typing import Optional
+
+from his.cache import Backend, LRUCache, Update, get_backend
+from his.config import get_config
+from his.exceptions import LoginThrottled
+
+
+__all__ = ["TokenBucket", "check_login"]
+
+
+ACCOUNT_CAPACITY = 10
+ACCOUNT_RATE = 0.1
+ADDRESS_CAPACITY = 50
+ADDRESS_RATE = 1
+DEFAULT_SIZE = 65536
+STATE = Struct("<dd")
+_BUCKETS = None
+
+
+class TokenBucket:
+    """A token bucket limiter storing its state in a cache backend."""
+
+    def __init__(self, backend: Backend, name: str, capacity: float, rate: float):
+        self.backend = backend
+        self.name = name
+        self.capacity = capacity
+        self.rate = rate
+
+    def consume(self, key: str) -> float:
+        """Takes a token for the key.
+
+        Returns 0 on success, otherwise the seconds
+        until the next token will be available.
+        """
+        return self.backend.update(
+            f"throttle:{self.name}:{key}", partial(self.take, time())
+        )
+
+    def take(self, now: float, state: Optional[bytes]) -> Update:
+        """Takes a token from the bucket's state at the given time."""
+        if state is None:
+            tokens = self.capacity
+        else:
+            tokens, updated = STATE.unpack(state)
+            tokens += max(now - updated, 0) * self.rate
+            tokens = min(self.capacity, tokens)
+
+        if tokens < 1:
+            return Update((1 - tokens) / self.rate, None, 0)
+
+        tokens -= 1
+        ttl = (self.capacity - tokens) / self.rate
+        return Update(0, STATE.pack(tokens, now), ttl)
+
+
+def load_buckets() -> tuple[TokenBucket, TokenBucket]:
+    """Creates the account name and client address buckets."""
+
+    config = get_config()
+
+    if config.get("throttle", "backend", fallback="memory") == "shared":
+        backend = get_backend()
+    else:
+        backend = LRUCache(config.getint("throttle", "size", fallback=DEFAULT_SIZE))
+
+    return (
+        TokenBucket(
+            backend,
+            "account",
+            config.getfloat("throttle", "account-capacity", fallback=ACCOUNT_CAPACITY),
+            config.getfloat("throttle", "account-rate", fallback=ACCOUNT_RATE),
+        ),
+        TokenBucket(
+            backend,
+            "address",
+            config.getfloat("throttle", "address-capacity", fallback=ADDRESS_CAPACITY),
+            config.getfloat("throttle", "address-rate", fallback=ADDRESS_RATE),
+        ),
+    )
+
+
+def check_login(name: str, address: str) -> None:
+    """Raises LoginThrottled if the login attempt exceeds a limit."""
+
+    global _BUCKETS  # pylint: disable=W0603
+
+    if _BUCKETS is None:
+        _BUCKETS = load_buckets()
+
+    accounts, addresses = _BUCKETS
+
+    if retry_after := addresses.consume(address):
+        raise LoginThrottled(ceil(retry_after))
+
+    if retry_after := accounts.consume(name):
+        raise LoginThrottled(ceil(retry_after))
@@ -0,0 +1,291 @@
+"""Signed, stateless session tokens.
+
+A token carries the session ID, the account's ID, name, customer
+and admin / root flags as well as an expiry date and is signed with
+HMAC-SHA256 under a server key.
+Tokens are validated without a database round-trip,
+except for a periodically refreshed revocation list, which also
+revokes tokens whose claims no longer match the account.
+The database session remains the source of truth and is used
+instead of the token while the revocation list is not current,
+as well as to issue fresh tokens once a token has expired.
+"""
+
+from __future__ import annotations
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from datetime import datetime, timedelta
+from hashlib import sha256
+from hmac import compare_digest, new
+from json import dumps, loads
+from logging import getLogger
+from threading import Lock, Thread
+from time import monotonic
+from typing import NamedTuple, Optional
+
+from flask import request
+from peewee import fn
+
+from his.cache import get_account_version, get_backend
+from his.config import get_config
+from his.orm.account import MAX_FAILED_LOGINS, Account
+from his.orm.session import Session
+from his.periodic import PeriodicTask
+
+
+__all__ = [
+    "InvalidToken",
+    "get_token_cookie",
+    "get_token_key",
+    "get_token_session",
+    "issue_token",
+    "revoke",
+    "start_revocation_list",
+]
+
+
+COOKIE = "his-token"
+LIFETIME = 300
+LOGGER = getLogger("his.tokens")
+REFRESH_INTERVAL = 30
+
+
+class InvalidToken(Exception):
+    """Indicates an invalid, expired or revoked token."""
+
+
+class Snapshot(NamedTuple):
+    """The live sessions and their accounts' claims as of a point in time."""
+
+    watermark: int
+    live: dict[int, tuple[int, int, bool, bool]]
+    loaded: float
+
+
+class RevocationList:
+    """Keeps track of revoked sessions.
+
+    A session is considered revoked if its ID is not newer than the
+    last snapshot, but it was not live at that time, i.e. it has been
+    closed, has expired or its account has been locked, or if its
+    account's claims have changed since the token was issued.
+    Sessions closed by this process are revoked immediately.
+    The snapshot is refreshed in the background and is no longer
+    relied upon once it is older than [token] max-snapshot-age.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.revoked = set()
+        self.lock = Lock()
+        self.task = None
+
+    @property
+    def current(self) -> bool:
+        """Determines whether the snapshot can be relied upon."""
+        if self.task is None or not self.task.is_alive():
+            self.start()
+
+        if (snapshot := self.snapshot) is None:
+            return False
+
+        interval = get_config().getfloat(
+            "token", "refresh-interval", fallback=REFRESH_INTERVAL
+        )
+        max_age = get_config().getfloat(
+            "token", "max-snapshot-age", fallback=3 * interval
+        )
+        return monotonic() - snapshot.loaded < max_age
+
+    def revokes(self, payload: dict) -> bool:
+        """Determines whether the token's session is revoked."""
+        if (ident := payload["sid"]) in self.revoked:
+            return True
+
+        if ident > (snapshot := self.snapshot).watermark:
+            return False
+
+        return snapshot.live.get(ident) != (
+            payload["aid"],
+            payload["cid"],
+            payload["admin"],
+            payload["root"],
+        )
+
+    def add(self, ident: int) -> None:
+        """Revokes the respective session locally."""
+        self.revoked.add(ident)
+
+    def start(self) -> None:
+        """Starts loading the list in the background."""
+        with self.lock:
+            if self.task is not None and self.task.is_alive():
+                return
+
+            self.task = PeriodicTask(
+                self.refresh,
+                get_config().getfloat(
+                    "token", "refresh-interval", fallback=REFRESH_INTERVAL
+                ),
+                "token-revocation",
+            )
+            self.task.start()
+            Thread(target=self.load, name="token-revocation-load", daemon=True).start()
+
+    def load(self) -> None:
+        """Loads the initial snapshot."""
+        try:
+            self.refresh()
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception("Could not load the token revocation list.")
+
+    def refresh(self) -> None:
+        """Reloads the live sessions from the database."""
+        now = datetime.now()
+        watermark = Session.select(fn.MAX(Session.id)).scalar() or 0
+        condition = (Session.start < now) & (Session.end > now)
+        condition &= Session.id <= watermark
+        condition &= Account.deleted >> None
+        condition &= Account.disabled == 0
+        condition &= (Account.locked_until >> None) | (Account.locked_until < now)
+        condition &= Account.failed_logins <= MAX_FAILED_LOGINS
+        select = (
+            Session.select(
+                Session.id, Account.id, Account.customer, Account.admin, Account.root
+            )
+            .join(Account)
+            .where(condition)
+        )
+        live = {
+            session: (account, customer, bool(admin), bool(root))
+            for session, account, customer, admin, root in select.tuples().iterator()
+        }
+        self.snapshot = Snapshot(watermark, live, monotonic())
+        self.revoked = {ident for ident in self.revoked if ident > watermark}
+        LOGGER.debug("Loaded %i live sessions.", len(live))
+
+
+REVOKED = RevocationList()
+
+
+def get_token_key() -> Optional[bytes]:
+    """Returns the token signing key iff tokens are enabled."""
+
+    if key := get_config().get("token", "key", fallback=None):
+        return key.encode()
+
+    return None
+
+
+def get_token_cookie() -> str:
+    """Returns the name of the token cookie."""
+
+    return get_config().get("token", "cookie", fallback=COOKIE)
+
+
+def b64encode(data: bytes) -> str:
+    """Encodes bytes as unpadded URL-safe base64."""
+
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def b64decode(data: str) -> bytes:
+    """Decodes unpadded URL-safe base64."""
+
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign(body: str, key: bytes) -> str:
+    """Returns the signature of the token body."""
+
+    return b64encode(new(key, body.encode(), sha256).digest())
+
+
+def issue_token(session: Session, key: bytes) -> tuple[str, datetime]:
+    """Issues a token for the session and returns it with its expiry."""
+
+    lifetime = get_config().getint("token", "lifetime", fallback=LIFETIME)
+    expires = min(session.end, datetime.now() + timedelta(seconds=lifetime))
+    account = session.account
+    payload = {
+        "sid": session.id,
+        "aid": account.id,
+        "name": account.name,
+        "cid": account.customer_id,
+        "admin": account.admin,
+        "root": account.root,
+        "ver": get_account_version(account.id).hex(),
+        "exp": int(expires.timestamp()),
+    }
+    body = b64encode(dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{sign(body, key)}", expires
+
+
+def decode_token(token: str, key: bytes) -> dict:
+    """Verifies the token and returns its payload."""
+
+    try:
+        body, signature = token.split(".")
+    except ValueError:
+        raise InvalidToken() from None
+
+    if not compare_digest(signature.encode(), sign(body, key).encode()):
+        raise InvalidToken()
+
+    try:
+        payload = loads(b64decode(body))
+    except (Base64Error, UnicodeDecodeError, ValueError):
+        raise InvalidToken() from None
+
+    if payload["exp"] <= datetime.now().timestamp():
+        raise InvalidToken()
+
+    if not REVOKED.current or REVOKED.revokes(payload):
+        raise InvalidToken()
+
+    # Unshared backends have per-process account versions.
+    if get_backend().shared:
+        if payload.get("ver") != get_account_version(payload["aid"]).hex():
+            raise InvalidToken()
+
+    return payload
+
+
+def get_token_session() -> Optional[Session]:
+    """Returns a stateless session from the request's token, if valid."""
+
+    if (key := get_token_key()) is None:
+        return None
+
+    if (token := request.cookies.get(get_token_cookie())) is None:
+        return None
+
+    try:
+        payload = decode_token(token, key)
+    except InvalidToken:
+        return None
+
+    return Session.restore(
+        {"id": payload["sid"], "end": datetime.fromtimestamp(payload["exp"])},
+        {
+            "id": payload["aid"],
+            "customer": payload["cid"],
+            "name": payload["name"],
+            "admin": payload["admin"],
+            "root": payload["root"],
+        },
+        stateless=True,
+    )
+
+
+def revoke(ident: int) -> None:
+    """Revokes tokens of the respective session in this process."""
+
+    REVOKED.add(ident)
+
+
+def start_revocation_list() -> None:
+    """Starts loading the revocation list if tokens are enabled."""
+
+    if get_token_key() is not None:
+        REVOKED.start()
@@ -12,7 +12,9 @@ from his.crypto import genpw
 from his.exceptions import AccountLimitReached, NotAuthorized
 from his.orm.account import Account
 from his.orm.customer_settings import CustomerSettings
+from his.wsgi.collection import collection
 from his.wsgi.functions import get_account
+from his.wsgi.projection import columns, get_fields, project, serializer
 
 
 __all__ = ["ROUTES"]
@@ -20,6 +22,7 @@ __all__ = ["ROUTES"]
 
 USER_FIELDS = {"fullName", "passwd", "email"}
 ADMIN_FIELDS = {"name", "fullName", "passwd", "email", "admin"}
+HIDDEN_FIELDS = {"passwd"}
 
 
 @require_json(dict)
@@ -65,14 +68,25 @@ def patch_account(account: Account, only: Optional[set] = None) -> JSONMessage:
 def list_() -> JSON:
     """List one or many accounts."""
 
-    return JSON([account.to_json() for account in ACCOUNT.subjects])
+    if (fields := get_fields(Account, skip=HIDDEN_FIELDS)) is None:
+        return collection(ACCOUNT.subjects, Account.id)
+
+    return collection(
+        ACCOUNT.select_subjects(*columns(Account, fields)),
+        Account.id,
+        serializer(fields),
+    )
 
 
 @authenticated
 def get(ident: Optional[int] = None) -> JSON:
     """Gets an account by name."""
 
-    return JSON(get_account(ident).to_json())
+    if (fields := get_fields(Account, skip=HIDDEN_FIELDS)) is None:
+        return JSON(get_account(ident).to_json())
+
+    account = get_account(ident, *columns(Account, fields))
+    return JSON(project(account.to_json(), fields))
 
 
 @authenticated
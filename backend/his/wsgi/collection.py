@@ -0,0 +1,172 @@
+"""Keyset pagination and streaming of collections.
+
+Collections are paginated if the client passes ?limit= and / or ?after=.
+Pages are ordered by primary key and contain an opaque cursor of the
+next page, which the client passes as ?after= to retrieve it.
+
+Unpaginated collections are streamed one record at a time if the client
+passes ?stream or sends Accept: application/x-ndjson, as a chunked JSON
+array or as newline-delimited JSON respectively.
+The MySQL driver buffers whole result sets, so streamed collections
+are read in keyset-paginated batches of [pagination] stream-batch-size
+rows instead of with one query.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error
+from json import dumps
+from typing import Any, Callable, Iterator, Optional
+
+from flask import Response, request, stream_with_context
+from peewee import Field, Model, Select
+
+from wsgilib import JSON
+
+from his.config import get_config
+from his.exceptions import InvalidPagination
+from his.functions import BATCH_SIZE, batches
+
+
+__all__ = ["collection"]
+
+
+DEFAULT_MAX_LIMIT = 1000
+NDJSON = "application/x-ndjson"
+
+
+def get_max_limit() -> int:
+    """Returns the maximum page size."""
+
+    return get_config().getint("pagination", "max-limit", fallback=DEFAULT_MAX_LIMIT)
+
+
+def encode_cursor(ident: int) -> str:
+    """Returns an opaque cursor of the primary key."""
+
+    return urlsafe_b64encode(str(ident).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Returns the primary key of the cursor."""
+
+    try:
+        return int(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (Error, ValueError):
+        raise InvalidPagination("Invalid cursor.") from None
+
+
+def get_limit() -> int:
+    """Returns the requested page size."""
+
+    maximum = get_max_limit()
+
+    if (limit := request.args.get("limit")) is None:
+        return maximum
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise InvalidPagination("Invalid limit.") from None
+
+    if limit < 1:
+        raise InvalidPagination("Invalid limit.")
+
+    return min(limit, maximum)
+
+
+def get_after() -> Optional[int]:
+    """Returns the primary key after which the page starts."""
+
+    if (cursor := request.args.get("after")) is None:
+        return None
+
+    return decode_cursor(cursor)
+
+
+def paginated() -> bool:
+    """Determines whether the client requested pagination."""
+
+    return "limit" in request.args or "after" in request.args
+
+
+def streaming() -> bool:
+    """Determines whether the client requested a streamed response."""
+
+    return "stream" in request.args or ndjson()
+
+
+def ndjson() -> bool:
+    """Determines whether the client prefers newline-delimited JSON."""
+
+    return request.accept_mimetypes.best == NDJSON
+
+
+def json_array(records: Iterator[Model], serialize: Callable[[Model], Any]):
+    """Yields the records as chunks of a JSON array."""
+
+    yield "["
+
+    for index, record in enumerate(records):
+        yield ("," if index else "") + dumps(serialize(record))
+
+    yield "]"
+
+
+def json_lines(records: Iterator[Model], serialize: Callable[[Model], Any]):
+    """Yields the records as newline-delimited JSON."""
+
+    for record in records:
+        yield dumps(serialize(record)) + "\n"
+
+
+def stream(select: Select, key: Field, serialize: Callable[[Model], Any]) -> Response:
+    """Streams the selected records in batches ordered by the key."""
+
+    batch_size = get_config().getint(
+        "pagination", "stream-batch-size", fallback=BATCH_SIZE
+    )
+    records = batches(select, key, batch_size=batch_size)
+
+    if ndjson():
+        chunks = json_lines(records, serialize)
+        return Response(stream_with_context(chunks), mimetype=NDJSON)
+
+    chunks = json_array(records, serialize)
+    return Response(stream_with_context(chunks), mimetype="application/json")
+
+
+def to_json(record: Model) -> Any:
+    """Serializes a record."""
+
+    return record.to_json()
+
+
+def collection(
+    select: Select, key: Field, serialize: Callable[[Model], Any] = to_json
+) -> Response:
+    """Returns the selected records as JSON.
+
+    If pagination is requested, returns an object with the page's
+    items and the cursor of the next page, which is None on the last.
+    """
+
+    if not paginated():
+        if streaming():
+            return stream(select, key, serialize)
+
+        return JSON([serialize(record) for record in select])
+
+    limit = get_limit()
+
+    if (after := get_after()) is not None:
+        select = select.where(key > after)
+
+    records = list(select.order_by(key).limit(limit + 1))
+
+    if len(records) > limit:
+        records = records[:limit]
+        cursor = encode_cursor(getattr(records[-1], key.name))
+    else:
+        cursor = None
+
+    return JSON({"items": [serialize(record) for record in records], "next": cursor})
@@ -2,22 +2,35 @@
 
 from typing import Optional
 
+from flask import Response, request
 from peewee import Select
 
 from mdb import Company, Customer
 from wsgilib import JSON, Binary
 
 from his.api import authenticated, root
-from his.wsgi.functions import get_customer, get_customer_settings
+from his.contextlocals import CUSTOMER
+from his.logos import Logo, get_logo_bytes, get_offload, offload
+from his.orm.customer_settings import CustomerSettings
+from his.wsgi.collection import collection
+from his.wsgi.functions import get_customer
+from his.wsgi.projection import columns, get_fields, project, serializer
 
 
 __all__ = ["ROUTES"]
 
 
-def get_customers() -> Select:
-    """Selects all customers."""
+def get_customers(*fields, company: bool = True) -> Select:
+    """Selects all customers.
 
-    return Customer.select(Customer, Company).join(Company).where(True)
+    If fields are given, only those are selected.
+    The company is only joined if company is True.
+    """
+
+    if not company:
+        return Customer.select(*fields).where(True)
+
+    return Customer.select(*(fields or [Customer]), Company).join(Company).where(True)
 
 
 @authenticated
@@ -25,21 +38,56 @@ def get_customers() -> Select:
 def list_() -> JSON:
     """Lists available customers."""
 
-    return JSON([record.to_json(company=True) for record in get_customers()])
+    if (fields := get_fields(Customer)) is None:
+        return collection(get_customers(), Customer.id, serializer(None, company=True))
+
+    company = "company" in fields
+    select = get_customers(*columns(Customer, fields), company=company)
+    return collection(select, Customer.id, serializer(fields, company=company))
 
 
 @authenticated
 def get(ident: Optional[int] = None) -> JSON:
     """Allows services"""
 
-    return JSON(get_customer(ident).to_json(company=True))
+    fields = get_fields(Customer)
+    return JSON(project(get_customer(ident).to_json(company=True), fields))
+
+
+def set_validators(response: Response, logo: Logo) -> Response:
+    """Sets the caching headers of the logo's response.
+
+    The logo's URL is the same for all customers,
+    so clients must revalidate it on every use.
+    """
+
+    response.set_etag(logo.sha256sum)
+    response.last_modified = logo.created
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @authenticated
-def get_logo() -> Binary:
-    """Allows services"""
+def get_logo() -> Response:
+    """Returns the customer's logo.
+
+    Clients presenting the logo's entity tag get
+    a 304 response without the logo being read.
+    If offloading is configured, the web server delivers the logo.
+    """
+
+    logo = CustomerSettings.get_logo(CUSTOMER.id)
+
+    if logo.sha256sum in request.if_none_match:
+        return set_validators(Response(status=304), logo)
+
+    if header := get_offload():
+        return set_validators(offload(logo, header), logo)
 
-    return Binary(get_customer_settings().logo)
+    response = Binary(get_logo_bytes(logo))
+    response.mimetype = logo.mimetype
+    return set_validators(response, logo)
 
 
 ROUTES = (
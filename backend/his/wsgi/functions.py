@@ -3,7 +3,7 @@
 from typing import Optional
 
 from flask import request
-from peewee import Select
+from peewee import Field, Select
 
 from mdb import Customer
 from recaptcha import verify
@@ -28,6 +28,9 @@ __all__ = [
     "get_customer_service",
     "get_customer_services",
     "get_customer_settings",
+    "get_current_account",
+    "get_current_customer",
+    "get_current_session",
     "get_service",
     "get_session",
 ]
@@ -46,13 +49,21 @@ def check_recaptcha() -> bool:
     return verify(recaptcha["secret"], request.json["response"])
 
 
-def get_account(ident: Optional[int]) -> Account:
-    """Safely returns the respective account."""
+def get_account(ident: Optional[int], *fields: Field) -> Account:
+    """Safely returns the respective account.
+
+    If fields are given, only those are selected without joins.
+    """
 
     if ident is None:
-        return ACCOUNT._get_current_object()
+        return get_current_account()
+
+    if fields:
+        select = Account.select(*{*fields, Account.customer, Account.name})
+    else:
+        select = Account.select(cascade=True)
 
-    select = Account.select(cascade=True).where(Account.id == ident)
+    select = select.where(Account.id == ident)
 
     if ACCOUNT.root:
         return select.get()
@@ -77,19 +88,25 @@ def get_account_service(ident: int) -> AccountService:
     return get_account_services().where(AccountService.id == ident).get()
 
 
-def get_account_services() -> Select:
-    """Selects the account services of the give account."""
+def get_account_services(*fields: Field) -> Select:
+    """Selects the account services of the give account.
 
-    return AccountService.select(cascade=True).where(
-        AccountService.account == ACCOUNT.id
-    )
+    If fields are given, only those are selected without joins.
+    """
+
+    if fields:
+        select = AccountService.select(*fields)
+    else:
+        select = AccountService.select(cascade=True)
+
+    return select.where(AccountService.account == ACCOUNT.id)
 
 
 def get_customer(ident: Optional[int]) -> Customer:
     """Returns the customer by the respective customer ID."""
 
     if ident is None:
-        return CUSTOMER._get_current_object()  # pylint: disable=W0212
+        return get_current_customer()
 
     customer = Customer.select(cascade=True).where(Customer.id == ident).get()
 
@@ -100,11 +117,29 @@ def get_customer(ident: Optional[int]) -> Customer:
         return customer
 
     if customer.id == CUSTOMER.id:
-        return CUSTOMER._get_current_object()
+        return get_current_customer()
 
     raise Customer.DoesNotExist()
 
 
+def get_current_account() -> Account:
+    """Returns the full record of the current account."""
+
+    return ACCOUNT._get_complete_object()  # pylint: disable=W0212
+
+
+def get_current_customer() -> Customer:
+    """Returns the full record of the current customer."""
+
+    return CUSTOMER._get_complete_object()  # pylint: disable=W0212
+
+
+def get_current_session() -> Session:
+    """Returns the full record of the current session."""
+
+    return SESSION._get_complete_object()  # pylint: disable=W0212
+
+
 def get_customer_service(ident: int) -> CustomerService:
     """Returns the customer service mapping
     of the given customer and service.
@@ -113,12 +148,18 @@ def get_customer_service(ident: int) -> CustomerService:
     return get_customer_services().where(CustomerService.id == ident).get()
 
 
-def get_customer_services() -> Select:
-    """Selects customer service mappings for the given customer."""
+def get_customer_services(*fields: Field) -> Select:
+    """Selects customer service mappings for the given customer.
 
-    return CustomerService.select(cascade=True).where(
-        CustomerService.customer == CUSTOMER.id
-    )
+    If fields are given, only those are selected without joins.
+    """
+
+    if fields:
+        select = CustomerService.select(*fields)
+    else:
+        select = CustomerService.select(cascade=True)
+
+    return select.where(CustomerService.customer == CUSTOMER.id)
 
 
 def get_customer_settings() -> CustomerSettings:
@@ -132,7 +173,12 @@ def get_customer_settings() -> CustomerSettings:
 def get_service(ident: int) -> Service:
     """Returns the respective service."""
 
-    return Service.select().where(Service.id == ident).get()
+    try:
+        ident = int(ident)
+    except (TypeError, ValueError):
+        raise Service.DoesNotExist() from None
+
+    return Service.lookup(ident)
 
 
 def get_session(account: Account, ident: int) -> Session:
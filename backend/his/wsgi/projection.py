@@ -0,0 +1,71 @@
+"""Sparse field projection of records.
+
+Clients may restrict the returned JSON keys with ?fields=key1,key2,...
+where the keys are the camel case names of the model's fields.
+"""
+
+from typing import Any, Callable, Iterable, Optional
+
+from flask import request
+from peewee import Field, Model
+
+from his.exceptions import InvalidFields
+
+
+__all__ = ["columns", "get_fields", "project", "serializer"]
+
+
+def camel_case(name: str) -> str:
+    """Converts a snake case name into camel case."""
+
+    first, *others = name.split("_")
+    return first + "".join(other.title() for other in others)
+
+
+def json_keys(model: type[Model], skip: Iterable[str] = ()) -> dict[str, Field]:
+    """Maps the JSON keys of the model to its fields."""
+
+    return {
+        camel_case(field.name): field
+        for field in model._meta.sorted_fields  # pylint: disable=W0212
+        if field.name not in skip
+    }
+
+
+def get_fields(
+    model: type[Model], skip: Iterable[str] = ()
+) -> Optional[frozenset[str]]:
+    """Returns the JSON keys requested via ?fields= or None."""
+
+    if (fields := request.args.get("fields")) is None:
+        return None
+
+    keys = frozenset(key for key in map(str.strip, fields.split(",")) if key)
+
+    if unknown := keys - set(json_keys(model, skip)):
+        raise InvalidFields(unknown)
+
+    return keys
+
+
+def columns(model: type[Model], fields: Iterable[str]) -> list[Field]:
+    """Returns the primary key and the fields of the requested JSON keys."""
+
+    keys = json_keys(model)
+    primary_key = model._meta.primary_key  # pylint: disable=W0212
+    return [primary_key, *(keys[key] for key in fields if keys[key] is not primary_key)]
+
+
+def project(json: dict, fields: Optional[Iterable[str]]) -> dict:
+    """Limits the JSON object to the requested keys."""
+
+    if fields is None:
+        return json
+
+    return {key: value for key, value in json.items() if key in fields}
+
+
+def serializer(fields: Optional[Iterable[str]], **kwargs) -> Callable[[Model], Any]:
+    """Returns a function serializing records limited to the requested keys."""
+
+    return lambda record: project(record.to_json(**kwargs), fields)
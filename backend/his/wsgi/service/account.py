@@ -5,13 +5,16 @@ from flask import request
 from wsgilib import JSON, JSONMessage, require_json
 
 from his.api import authenticated, admin
+from his.cache import invalidate_account
 from his.contextlocals import ACCOUNT
 from his.errors import NOT_AUTHORIZED
 from his.orm.account_service import AccountService
+from his.wsgi.collection import collection
 from his.wsgi.functions import get_account
 from his.wsgi.functions import get_account_service
 from his.wsgi.functions import get_account_services
 from his.wsgi.functions import get_service
+from his.wsgi.projection import columns, get_fields, serializer
 
 
 __all__ = ["ROUTES"]
@@ -21,7 +24,9 @@ __all__ = ["ROUTES"]
 def list_() -> JSON:
     """Lists account services of the current account."""
 
-    return JSON([acs.to_json() for acs in get_account_services()])
+    fields = get_fields(AccountService)
+    select = get_account_services(*columns(AccountService, fields) if fields else ())
+    return collection(select, AccountService.id, serializer(fields))
 
 
 @authenticated
@@ -45,7 +50,9 @@ def add() -> JSONMessage:
 def delete(ident: int) -> JSONMessage:
     """Deletes the respective account <> service mapping."""
 
-    get_account_service(ident).delete_instance()
+    account_service = get_account_service(ident)
+    account_service.delete_instance()
+    invalidate_account(account_service.account_id)
     return JSONMessage("Account service deleted.", status=200)
 
 
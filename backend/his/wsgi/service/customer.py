@@ -5,11 +5,14 @@ from flask import request
 from wsgilib import JSON, JSONMessage, require_json
 
 from his.api import authenticated, root, admin
+from his.cache import invalidate_customer
 from his.orm.customer_service import CustomerService
+from his.wsgi.collection import collection
 from his.wsgi.functions import get_customer
 from his.wsgi.functions import get_customer_service
 from his.wsgi.functions import get_customer_services
 from his.wsgi.functions import get_service
+from his.wsgi.projection import columns, get_fields, serializer
 
 
 __all__ = ["ROUTES"]
@@ -20,7 +23,9 @@ __all__ = ["ROUTES"]
 def list_() -> JSON:
     """Lists services of the respective customer."""
 
-    return JSON([cs.to_json() for cs in get_customer_services()])
+    fields = get_fields(CustomerService)
+    select = get_customer_services(*columns(CustomerService, fields) if fields else ())
+    return collection(select, CustomerService.id, serializer(fields))
 
 
 @authenticated
@@ -42,6 +47,7 @@ def delete(ident: int) -> JSONMessage:
 
     customer_service = get_customer_service(ident)
     customer_service.delete_instance()
+    invalidate_customer(customer_service.customer_id)
     return JSONMessage("Customer service deleted.", status=200)
 
 
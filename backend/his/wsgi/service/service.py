@@ -3,8 +3,11 @@
 from wsgilib import JSON
 
 from his.api import authenticated
+from his.authorization import get_effective_services
 from his.contextlocals import ACCOUNT
 from his.orm.service import Service
+from his.wsgi.collection import collection
+from his.wsgi.projection import columns, get_fields, project, serializer
 
 
 __all__ = ["ROUTES"]
@@ -14,13 +17,37 @@ __all__ = ["ROUTES"]
 def list_() -> JSON:
     """Lists promoted services."""
 
-    select = Service.select()
+    fields = get_fields(Service)
+    select = Service.select(*columns(Service, fields) if fields else ())
     condition = True
 
     if not ACCOUNT.root:
         condition &= Service.promote != 0
 
-    return JSON([service.to_json() for service in select.where(condition)])
+    return collection(select.where(condition), Service.id, serializer(fields))
 
 
-ROUTES = [("GET", "/service", list_)]
+@authenticated
+def effective() -> JSON:
+    """Lists all services the account can use,
+    including those granted through dependencies.
+    """
+
+    fields = get_fields(Service)
+
+    if ACCOUNT.root:
+        return JSON(
+            [project(service.to_json(), fields) for service in Service.registered()]
+        )
+
+    services = get_effective_services(ACCOUNT)
+    return JSON(
+        [
+            project(service.to_json(), fields)
+            for service in Service.registered()
+            if service.id in services
+        ]
+    )
+
+
+ROUTES = [("GET", "/service", list_), ("GET", "/service/effective", effective)]
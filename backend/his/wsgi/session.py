@@ -1,5 +1,6 @@
 """HIS session service."""
 
+from logging import getLogger
 from typing import Optional, Union
 
 from flask import request, Response, make_response
@@ -7,17 +8,26 @@ from flask import request, Response, make_response
 from wsgilib import JSON, JSONMessage, require_json
 
 from his.api import authenticated
-from his.contextlocals import ACCOUNT, SESSION, get_session_duration
+from his.cache import evict_session
+from his.contextlocals import ACCOUNT, SESSION, get_session_duration, invalidate
 from his.exceptions import InvalidCredentials, NotAuthorized
 from his.orm.account import Account
 from his.orm.session import Session
 from his.session import set_session_cookie, delete_session_cookie
-from his.wsgi.functions import get_session
+from his.throttle import check_login
+from his.tokens import revoke
+from his.wsgi.collection import collection
+from his.wsgi.functions import get_current_session, get_session
+from his.wsgi.projection import columns, get_fields, project, serializer
 
 
 __all__ = ["ROUTES"]
 
 
+HIDDEN_FIELDS = {"secret"}
+LOGGER = getLogger("his.session")
+
+
 def make_login(account: Account, duration: int) -> Response:
     """Performs the actual login."""
 
@@ -32,6 +42,7 @@ def login() -> Response:
 
     account = request.json["account"]
     passwd = request.json["passwd"]
+    check_login(account, request.remote_addr)
 
     try:
         account = Account.select(cascade=True).where(Account.name == account).get()
@@ -39,24 +50,40 @@ def login() -> Response:
         raise InvalidCredentials() from None
 
     if account.login(passwd):
-        return make_login(account, get_session_duration())
+        response = make_login(account, get_session_duration())
+
+        if account.needs_rehash:
+            response.call_on_close(lambda: rehash(account, passwd))
+
+        return response
 
     raise InvalidCredentials()
 
 
+def rehash(account: Account, passwd: str) -> None:
+    """Re-hashes the account's password after the response has been sent."""
+
+    try:
+        account.rehash(passwd)
+    except Exception:  # pylint: disable=W0703
+        LOGGER.exception("Could not rehash password of %s.", account)
+
+
 @authenticated
 def list_() -> Union[JSON, JSONMessage]:
     """Lists all sessions iff specified session is root."""
 
-    select = Session.select().join(Account)
+    fields = get_fields(Session, skip=HIDDEN_FIELDS)
+    select = Session.select(*columns(Session, fields) if fields else ())
 
     if ACCOUNT.root:
-        return JSON([session.to_json() for session in select.where(True)])
+        return collection(select.where(True), Session.id, serializer(fields))
 
     condition = Account.customer == ACCOUNT.customer
 
     if ACCOUNT.admin:
-        return JSON([session.to_json() for session in select.where(condition)])
+        select = select.join(Account).where(condition)
+        return collection(select, Session.id, serializer(fields))
 
     raise NotAuthorized()
 
@@ -65,10 +92,12 @@ def list_() -> Union[JSON, JSONMessage]:
 def get(ident: Optional[int] = None) -> JSON:
     """Lists the respective session."""
 
+    fields = get_fields(Session, skip=HIDDEN_FIELDS)
+
     if ident is None:
-        return JSON(SESSION.to_json())
+        return JSON(project(get_current_session().to_json(), fields))
 
-    return JSON(get_session(ACCOUNT, ident).to_json())
+    return JSON(project(get_session(ACCOUNT, ident).to_json(), fields))
 
 
 @authenticated
@@ -79,7 +108,7 @@ def refresh(ident: Optional[int] = None) -> JSON:
     """
 
     if ident is None:
-        return JSON(SESSION.to_json())
+        return JSON(get_current_session().to_json())
 
     return JSON(get_session(ACCOUNT, ident).to_json())
 
@@ -88,6 +117,8 @@ def close_session(session: Session) -> Response:
     """Closes a session."""
 
     session.delete_instance()
+    evict_session(session.id)
+    revoke(session.id)
     return delete_session_cookie(make_response(JSON({"closed": session.id})))
 
 
@@ -95,8 +126,10 @@ def close_session(session: Session) -> Response:
 def close(ident: Optional[int] = None) -> Response:
     """Closes the provided session."""
 
-    if ident is None:
-        return close_session(SESSION)
+    if ident is None or ident == SESSION.id:
+        response = close_session(SESSION._get_current_object())
+        invalidate()
+        return response
 
     return close_session(get_session(ACCOUNT, ident))
 
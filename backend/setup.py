@@ -30,7 +30,15 @@ setup(
     author_email="<info@homeinfo.de>",
     maintainer="Richard Neumann",
     maintainer_email="<r.neumann@homeinfo.de>",
-    packages=["his", "his.hisutil", "his.orm", "his.wsgi", "his.wsgi.service"],
+    extras_require={"redis": ["redis"]},
+    packages=[
+        "his",
+        "his.cache",
+        "his.hisutil",
+        "his.orm",
+        "his.wsgi",
+        "his.wsgi.service",
+    ],
     entry_points={"console_scripts": ["hisutil = his.hisutil:main"]},
     data_files=[
         ("/usr/local/etc/his.d", ["files/pwreset.html", "files/bugreport.html"])
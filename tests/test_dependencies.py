@@ -0,0 +1,84 @@
+"""Tests of the service dependency closure."""
+
+from unittest import TestCase, main
+
+from peewee import SqliteDatabase
+
+from his.dependencies import DependencyGraph
+from his.orm.service import Service
+from his.orm.service_dependency import ServiceDependency
+
+
+MODELS = [Service, ServiceDependency]
+# 1 -> 2 -> 3 -> 1 is a cycle, 4 is a leaf and 5 is unrelated.
+EDGES = [(1, 2), (2, 3), (3, 1), (3, 4)]
+
+
+def get_database() -> SqliteDatabase:
+    """Returns an in-memory database with the MySQL functions of the CTE."""
+
+    database = SqliteDatabase(":memory:")
+    database.func("CONCAT")(lambda *args: "".join(map(str, args)))
+    database.func("LOCATE")(lambda needle, haystack: haystack.find(needle) + 1)
+    return database
+
+
+class TestClosureCTE(TestCase):
+    """Tests the recursive closure query on SQLite."""
+
+    def setUp(self):
+        for model in MODELS:
+            meta = model._meta  # pylint: disable=W0212
+            self.addCleanup(setattr, meta, "schema", meta.schema)
+            meta.schema = None
+
+        database = get_database()
+        context = database.bind_ctx(MODELS)
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+        database.create_tables(MODELS)
+        Service.insert_many([{"id": ident} for ident in range(1, 6)]).execute()
+        ServiceDependency.insert_many(
+            [{"service": service, "dependency": dep} for service, dep in EDGES]
+        ).execute()
+
+    def test_cycle(self):
+        """Tests that cycles are not followed."""
+        self.assertEqual(
+            ServiceDependency.closure([1, 3]),
+            {1: frozenset({2, 3, 4}), 3: frozenset({1, 2, 4})},
+        )
+
+    def test_max_depth(self):
+        """Tests that the recursion stops at max_depth."""
+        self.assertEqual(ServiceDependency.closure([1], max_depth=1), {1: {2}})
+        self.assertEqual(ServiceDependency.closure([1], max_depth=2), {1: {2, 3}})
+
+    def test_without_dependencies(self):
+        """Tests services without dependencies."""
+        self.assertEqual(ServiceDependency.closure([4, 5]), {4: set(), 5: set()})
+        self.assertEqual(ServiceDependency.closure([]), {})
+
+    def test_deps(self):
+        """Tests selecting the dependencies with one recursive query."""
+        self.assertEqual(
+            {service.id for service in ServiceDependency.deps(1, recursive=True)},
+            {2, 3, 4},
+        )
+
+
+class TestDependencyGraph(TestCase):
+    """Tests the in-process dependency graph."""
+
+    def test_cycle(self):
+        """Tests that the closure of cyclic dependencies terminates."""
+        graph = DependencyGraph(EDGES, ())
+        self.assertEqual(graph.dependencies(1), {1, 2, 3, 4})
+        self.assertEqual(graph.dependencies(4), set())
+        self.assertEqual(graph.dependents(4), {1, 2, 3})
+        self.assertTrue(graph.provides(2, 4))
+        self.assertFalse(graph.provides(4, 2))
+
+
+if __name__ == "__main__":
+    main()
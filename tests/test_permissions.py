@@ -0,0 +1,80 @@
+"""Tests of the bitset permission index."""
+
+from unittest import TestCase, main
+
+from his.permissions import ADMIN, ROOT, AccountEntry, PermissionIndex
+
+
+SERVICES = [1, 2, 3, 40]
+CUSTOMERS = {10: 0b0011, 20: 0b1100}
+ACCOUNTS = {
+    100: AccountEntry(10, 0, 0b0001),
+    101: AccountEntry(10, ADMIN, 0b1111),
+    200: AccountEntry(20, 0, 0b0110),
+    300: AccountEntry(30, ROOT, 0),
+}
+
+
+def make_index() -> PermissionIndex:
+    """Returns an index of the test data."""
+
+    return PermissionIndex(
+        SERVICES,
+        CUSTOMERS,
+        ACCOUNTS,
+        expires=1_900_000_000.5,
+        version=b"12345678",
+    )
+
+
+class TestPermissionIndex(TestCase):
+    """Tests the permission index."""
+
+    def test_round_trip(self):
+        """Tests that dumps() and loads() preserve the index."""
+        index = PermissionIndex.loads(make_index().dumps())
+        self.assertEqual(index.services, SERVICES)
+        self.assertEqual(index.customers, CUSTOMERS)
+        self.assertEqual(index.accounts, ACCOUNTS)
+        self.assertEqual(index.expires, 1_900_000_000.5)
+        self.assertEqual(index.version, b"12345678")
+
+    def test_round_trip_empty(self):
+        """Tests the round trip of an index without entries or expiry."""
+        index = PermissionIndex.loads(PermissionIndex([], {}, {}).dumps())
+        self.assertEqual(index.services, [])
+        self.assertEqual(index.customers, {})
+        self.assertEqual(index.accounts, {})
+        self.assertIsNone(index.expires)
+        self.assertEqual(index.version, b"")
+
+    def test_can_use(self):
+        """Tests permission checks of single accounts."""
+        index = make_index()
+        self.assertTrue(index.can_use(100, 1))
+        self.assertFalse(index.can_use(100, 2))
+        self.assertTrue(index.can_use(101, 2))
+        self.assertFalse(index.can_use(101, 3))
+        self.assertTrue(index.can_use(200, 3))
+        self.assertTrue(index.can_use(300, 99))
+
+    def test_accounts_for(self):
+        """Tests selecting the accounts that can use a service."""
+        index = make_index()
+        self.assertEqual(index.accounts_for(1), [100, 101, 300])
+        self.assertEqual(index.accounts_for(2), [101, 300])
+        self.assertEqual(index.accounts_for(3), [200, 300])
+        self.assertEqual(index.accounts_for(40), [300])
+
+    def test_accounts_for_subset(self):
+        """Tests restricting the checked accounts."""
+        index = make_index()
+        self.assertEqual(index.accounts_for(1, [100, 200, 999]), [100])
+
+    def test_accounts_for_unknown_service(self):
+        """Tests that only root accounts can use unknown services."""
+        self.assertEqual(make_index().accounts_for(99), [300])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Tests of session secrets."""
+
+from datetime import timedelta
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from his.crypto import is_keyed_hash
+from his.orm.session import Session
+
+
+KEY = b"session-key"
+
+
+def reload(session: Session) -> Session:
+    """Passes the session through the secret field's database conversion."""
+
+    field = Session.secret
+    return Session(
+        __no_default__=1,
+        id=session.id,
+        secret=field.python_value(field.db_value(session.secret)),
+    )
+
+
+@patch.object(Session, "save")
+class TestSessionSecret(TestCase):
+    """Tests storing and verifying session secrets."""
+
+    def test_keyed_hash(self, _):
+        """Tests Session.add -> reload -> verify with a session key."""
+        with patch("his.orm.session.get_session_key", return_value=KEY):
+            session, secret = Session.add(1, timedelta(minutes=5))
+            self.assertTrue(is_keyed_hash(session.secret))
+            session = reload(session)
+            self.assertTrue(is_keyed_hash(session.secret))
+            self.assertTrue(session.verify(secret))
+            self.assertFalse(session.verify(secret[::-1]))
+
+    def test_argon2_hash(self, _):
+        """Tests Session.add -> reload -> verify without a session key."""
+        with patch("his.orm.session.get_session_key", return_value=None):
+            session, secret = Session.add(1, timedelta(minutes=5))
+            self.assertFalse(is_keyed_hash(session.secret))
+            session = reload(session)
+            self.assertTrue(session.verify(secret))
+            self.assertFalse(session.verify(secret[::-1]))
+
+
+if __name__ == "__main__":
+    main()
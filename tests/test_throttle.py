@@ -0,0 +1,59 @@
+"""Tests of the login throttle."""
+
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from his.cache import LRUCache
+from his.throttle import TokenBucket
+
+
+NOW = 1_000_000.0
+
+
+class TestTokenBucket(TestCase):
+    """Tests the token bucket limiter."""
+
+    def setUp(self):
+        self.bucket = TokenBucket(LRUCache(16), "test", capacity=3, rate=0.5)
+
+    def consume(self, key: str, now: float) -> float:
+        """Takes a token for the key at the given time."""
+        with patch("his.throttle.time", return_value=now):
+            return self.bucket.consume(key)
+
+    def test_limit(self):
+        """Tests that no more than capacity attempts pass at once."""
+        for _ in range(3):
+            self.assertEqual(self.consume("key", NOW), 0)
+
+        self.assertEqual(self.consume("key", NOW), 2)
+        self.assertEqual(self.consume("key", NOW), 2)
+
+    def test_refill(self):
+        """Tests that tokens are refilled at the rate."""
+        for _ in range(3):
+            self.consume("key", NOW)
+
+        self.assertEqual(self.consume("key", NOW + 1), 1)
+        self.assertEqual(self.consume("key", NOW + 2), 0)
+        self.assertEqual(self.consume("key", NOW + 2), 2)
+
+    def test_capacity(self):
+        """Tests that refilled tokens do not exceed the capacity."""
+        self.consume("key", NOW)
+
+        for _ in range(3):
+            self.assertEqual(self.consume("key", NOW + 3600), 0)
+
+        self.assertEqual(self.consume("key", NOW + 3600), 2)
+
+    def test_keys(self):
+        """Tests that every key has its own bucket."""
+        for _ in range(3):
+            self.consume("key", NOW)
+
+        self.assertEqual(self.consume("other", NOW), 0)
+
+
+if __name__ == "__main__":
+    main()